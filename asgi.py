@@ -0,0 +1,6 @@
+# asgi.py
+from app import create_app
+from app.asgi import AsyncAPI
+
+# ASGI mode: uvicorn asgi:app --workers 1
+app = AsyncAPI(create_app())
@@ -0,0 +1,73 @@
+# app/__init__.py
+from flask import Flask
+from markupsafe import Markup, escape
+from app.config import get_config
+from app.serialization import JSONProvider
+from app.proxy import init_proxy
+from app.database import init_db
+from app.replicas import init_replicas
+from app.email_service import init_mail
+from app.search import init_search
+from app.events import init_events
+from app.analytics import init_analytics
+from app.export import init_export
+from app.archive import init_archive
+from app.metrics import init_metrics
+from app.ratelimit import init_ratelimit
+from app.fragments import init_fragments
+from app.principals import init_principals, load_principal, principal_from_request
+from flask_login import LoginManager
+
+login_manager = LoginManager()
+
+def create_app(config_class=None):
+    app = Flask(__name__)
+    app.config.from_object(config_class or get_config())
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set')
+    app.json = JSONProvider(app)
+    
+    # Initialize extensions
+    init_proxy(app)
+    init_db(app)
+    init_replicas(app)
+    init_mail(app)
+    init_search(app)
+    init_events(app)
+    init_analytics(app)
+    init_export(app)
+    init_archive(app)
+    init_metrics(app)
+    init_principals(app)
+    init_ratelimit(app)
+    init_fragments(app)
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+    
+    # Register blueprints
+    from app.routes.auth import auth_bp
+    from app.routes.incidents import incidents_bp
+    from app.routes.api import api_bp
+    from app.routes.main import main_bp
+    
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(incidents_bp)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(main_bp)
+    
+    # view.html renders multi-line descriptions and comments through nl2br
+    @app.template_filter('nl2br')
+    def nl2br(value):
+        return Markup('<br>\n').join(escape(value).splitlines())
+    
+    # Setup login manager; both loaders go through the principal cache in
+    # app/principals.py, so most requests never query the user
+    @login_manager.user_loader
+    def load_user(user_id):
+        return load_principal(int(user_id))
+    
+    @login_manager.request_loader
+    def load_user_from_request(request):
+        return principal_from_request(request)
+    
+    return app
\ No newline at end of file
@@ -0,0 +1,244 @@
+# app/analytics.py
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import inspect, insert
+from app.database import db
+from app.models.incident_event import IncidentEvent
+
+# Incident columns whose changes are written to the event log, and the
+# event_type each one is logged under
+TRACKED_FIELDS = {
+    'status': 'status',
+    'assignee_id': 'assignee',
+    'priority': 'priority',
+    'incident_type': 'incident_type'
+}
+RESOLVED_STATUSES = ('resolved', 'closed')
+
+# Breakdowns served by /api/analytics/<dimension>, keyed by their URL name
+DIMENSIONS = {
+    'priority': 'priority',
+    'type': 'incident_type',
+    'assignee': 'assignee_id'
+}
+
+CATCH_UP_CHUNK = 5000
+DEFAULT_SETTLE_SECONDS = 2
+
+# Durations go into fixed, log-spaced buckets 10% wide covering one second to
+# about five years, so a percentile is a walk over at most BUCKET_COUNT
+# counters however many incidents have been recorded
+BUCKET_GROWTH = 1.1
+BUCKET_COUNT = 200
+
+def _text(value):
+    return None if value is None else str(value)
+
+def record_event(incident, event_type, from_value=None, to_value=None, actor_id=None):
+    # Adds the event to the caller's transaction; it commits with the change
+    db.session.add(IncidentEvent(
+        incident_id=incident.id,
+        event_type=event_type,
+        from_value=_text(from_value),
+        to_value=_text(to_value),
+        actor_id=actor_id,
+        priority=incident.priority,
+        incident_type=incident.incident_type,
+        assignee_id=incident.assignee_id,
+        created_at=datetime.utcnow()
+    ))
+
+def record_changes(incident, actor_id=None):
+    # Logs one event per tracked column changed since the incident was loaded;
+    # must run before the commit clears the attribute history
+    state = inspect(incident)
+    changes = []
+    for field, event_type in TRACKED_FIELDS.items():
+        history = state.attrs[field].history
+        if not history.added:
+            continue
+        old = history.deleted[0] if history.deleted else None
+        new = history.added[0]
+        if _text(old) != _text(new):
+            changes.append((event_type, old, new))
+
+    for event_type, old, new in changes:
+        record_event(incident, event_type, old, new, actor_id)
+
+def record_created_events(rows, actor_id=None):
+    # Bulk counterpart of record_event for rows from bulk_insert_incidents
+    if not rows:
+        return
+    db.session.execute(insert(IncidentEvent), [{
+        'incident_id': row['id'],
+        'event_type': 'created',
+        'to_value': row['status'],
+        'actor_id': actor_id,
+        'priority': row['priority'],
+        'incident_type': row['incident_type'],
+        'assignee_id': row.get('assignee_id'),
+        'created_at': row['created_at']
+    } for row in rows])
+
+class DurationHistogram:
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        seconds = max(seconds, 0.0)
+        if seconds < 1:
+            index = 0
+        else:
+            index = min(int(math.log(seconds, BUCKET_GROWTH)) + 1, BUCKET_COUNT - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                # Geometric midpoint of the bucket; bucket 0 holds sub-second values
+                return 0.5 if index == 0 else BUCKET_GROWTH ** (index - 0.5)
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0, 'mean': None, 'p50': None, 'p90': None}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 1),
+            'p50': round(self.percentile(0.5), 1),
+            'p90': round(self.percentile(0.9), 1)
+        }
+
+class Aggregate:
+
+    def __init__(self):
+        self.created = 0
+        self.acknowledged = 0
+        self.resolved = 0
+        self.mtta = DurationHistogram()
+        self.mttr = DurationHistogram()
+
+    def to_dict(self):
+        return {
+            'created': self.created,
+            'acknowledged': self.acknowledged,
+            'resolved': self.resolved,
+            'mtta_seconds': self.mtta.summary(),
+            'mttr_seconds': self.mttr.summary()
+        }
+
+class AnalyticsEngine:
+    # Rolling MTTA/MTTR aggregates folded incrementally from the incident_event
+    # log. Each read first applies only the events written since the previous
+    # one, by any process, so after a one-off warm-up scan the cost of a read
+    # does not depend on how much history there is.
+    #
+    # Acknowledged means first assigned or first moved out of 'open'; resolved
+    # means first moved to 'resolved' or 'closed'. Durations are measured from
+    # the 'created' event.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_event_id = 0  # every event up to this id has been applied
+        self._applied = set()  # ids above _last_event_id applied out of order
+        self._pending = {}  # incident_id -> [created_at, acknowledged] until resolved
+        self._overall = Aggregate()
+        self._by = {column: defaultdict(Aggregate) for column in DIMENSIONS.values()}
+
+    def catch_up(self):
+        # Events are applied once they are ANALYTICS_SETTLE_SECONDS old. The
+        # watermark only passes an id once the events around it are twice
+        # that old, so every pass re-reads the ids above it and picks up a
+        # transaction that took a lower id but committed later.
+        settle = current_app.config.get('ANALYTICS_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=settle)
+        horizon = cutoff - timedelta(seconds=settle)
+        columns = IncidentEvent.__table__.c
+
+        with self._lock:
+            after = self._last_event_id
+            advancing = True
+            while True:
+                events = db.session.query(*columns).filter(columns.id > after) \
+                    .order_by(columns.id).limit(CATCH_UP_CHUNK).all()
+                for event in events:
+                    if event.created_at <= cutoff and event.id not in self._applied:
+                        self._apply(event)
+                        self._applied.add(event.id)
+                    if advancing and event.created_at <= horizon:
+                        self._last_event_id = event.id
+                        self._applied.discard(event.id)
+                    else:
+                        advancing = False
+                if len(events) < CATCH_UP_CHUNK:
+                    return
+                after = events[-1].id
+
+    def _aggregates(self, event):
+        yield self._overall
+        for column, groups in self._by.items():
+            yield groups[getattr(event, column)]
+
+    def _apply(self, event):
+        if event.event_type == 'created':
+            self._pending[event.incident_id] = [event.created_at, False]
+            for aggregate in self._aggregates(event):
+                aggregate.created += 1
+            return
+
+        state = self._pending.get(event.incident_id)
+        if state is None:
+            return
+
+        if event.event_type == 'deleted':
+            del self._pending[event.incident_id]
+            return
+
+        created_at, acknowledged = state
+        seconds = (event.created_at - created_at).total_seconds()
+
+        if not acknowledged and (event.event_type == 'assignee' or
+                                 (event.event_type == 'status' and event.to_value != 'open')):
+            state[1] = True
+            for aggregate in self._aggregates(event):
+                aggregate.acknowledged += 1
+                aggregate.mtta.add(seconds)
+
+        if event.event_type == 'status' and event.to_value in RESOLVED_STATUSES:
+            del self._pending[event.incident_id]
+            for aggregate in self._aggregates(event):
+                aggregate.resolved += 1
+                aggregate.mttr.add(seconds)
+
+    def summary(self):
+        self.catch_up()
+        with self._lock:
+            return dict(self._overall.to_dict(), open=len(self._pending))
+
+    def breakdown(self, dimension):
+        self.catch_up()
+        with self._lock:
+            groups = self._by[DIMENSIONS[dimension]]
+            return {
+                'unassigned' if key is None else str(key): aggregate.to_dict()
+                for key, aggregate in groups.items()
+            }
+
+def init_analytics(app):
+    app.extensions['analytics'] = AnalyticsEngine()
+
+def get_analytics():
+    return current_app.extensions['analytics']
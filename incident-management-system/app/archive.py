@@ -0,0 +1,134 @@
+# app/archive.py
+import atexit
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import DateTime, delete, func, insert, literal, select
+from sqlalchemy.orm import joinedload
+from app.database import db
+from app.models.incident import Incident
+from app.models.comment import Comment
+from app.models.archive import ArchivedIncident, ArchivedComment
+from app.stats import invalidate_stats
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_ARCHIVE_BATCH_SIZE = 500
+
+INCIDENT_COLUMNS = [column.name for column in Incident.__table__.columns]
+COMMENT_COLUMNS = [column.name for column in Comment.__table__.columns]
+
+def _archivable(cutoff):
+    # Closing is normally the last change an incident gets, so updated_at is
+    # when it closed; a later comment bumps it and keeps the incident live
+    return db.session.query(Incident.id).filter(Incident.status == 'closed', Incident.updated_at < cutoff)
+
+def archive_batch(cutoff, batch_size):
+    # Moves one batch of incidents with their comments in a single transaction
+    # of set-based INSERT ... SELECT and DELETE statements; returns how many
+    # incidents were moved
+    ids = [incident_id for incident_id, in _archivable(cutoff).order_by(Incident.id).limit(batch_size)]
+    if not ids:
+        return 0
+
+    incident = Incident.__table__
+    comment = Comment.__table__
+    now = datetime.utcnow()
+
+    db.session.execute(insert(ArchivedIncident.__table__).from_select(
+        INCIDENT_COLUMNS + ['archived_at'],
+        select(*[incident.c[name] for name in INCIDENT_COLUMNS], literal(now, DateTime)).where(incident.c.id.in_(ids))
+    ))
+    db.session.execute(insert(ArchivedComment.__table__).from_select(
+        COMMENT_COLUMNS,
+        select(*[comment.c[name] for name in COMMENT_COLUMNS]).where(comment.c.incident_id.in_(ids))
+    ))
+    db.session.execute(delete(comment).where(comment.c.incident_id.in_(ids)))
+    db.session.execute(delete(incident).where(incident.c.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+def archive_closed_incidents(days=None, batch_size=None):
+    if days is None:
+        days = current_app.config.get('ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+    if batch_size is None:
+        batch_size = current_app.config.get('ARCHIVE_BATCH_SIZE', DEFAULT_ARCHIVE_BATCH_SIZE)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    # Small batches keep each transaction, and the locks it holds, short
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+
+    if total:
+        invalidate_stats()
+    return total
+
+def count_archivable(days):
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return _archivable(cutoff).with_entities(func.count(Incident.id)).scalar()
+
+def find_archived_incident(incident_id):
+    return ArchivedIncident.query.options(joinedload(ArchivedIncident.creator), joinedload(ArchivedIncident.assignee)) \
+        .filter(ArchivedIncident.id == incident_id).first()
+
+def archived_comment_timeline(incident_id):
+    # Unordered, like comment_timeline
+    return ArchivedComment.query.filter_by(incident_id=incident_id).options(joinedload(ArchivedComment.author))
+
+class ArchiveScheduler:
+    # Runs archive_closed_incidents every ARCHIVE_INTERVAL seconds in a
+    # background thread. Enable it in one process only, or run
+    # `flask archive` from cron instead.
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='incident-archiver', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.wait(self.interval):
+                try:
+                    moved = archive_closed_incidents()
+                    if moved:
+                        self.app.logger.info('Archived %d closed incidents', moved)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Incident archival failed')
+                finally:
+                    db.session.remove()
+
+    def shutdown(self):
+        self._stop.set()
+
+def init_archive(app):
+    interval = app.config.get('ARCHIVE_INTERVAL', 0)
+    if interval:
+        scheduler = ArchiveScheduler(app, interval)
+        app.extensions['archive_scheduler'] = scheduler
+        scheduler.start()
+
+    @app.cli.command('archive')
+    @click.option('--days', type=int, default=None, help='Archive incidents closed for more than this many days.')
+    @click.option('--batch-size', type=int, default=None, help='Incidents moved per transaction.')
+    @click.option('--dry-run', is_flag=True, help='Only report how many incidents would be archived.')
+    def archive(days, batch_size, dry_run):
+        """Move long-closed incidents and their comments to the archive tables."""
+        if days is None:
+            days = app.config.get('ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+        if dry_run:
+            click.echo(f'{count_archivable(days)} incidents would be archived.')
+            return
+        click.echo(f'Archived {archive_closed_incidents(days, batch_size)} incidents.')
@@ -0,0 +1,300 @@
+# app/asgi.py
+import asyncio
+import time
+from urllib.parse import parse_qsl
+from a2wsgi import WSGIMiddleware
+from flask_login.config import COOKIE_NAME
+from itsdangerous import BadSignature
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie, parse_etags
+from werkzeug.routing import Map, Rule
+from app.database import create_async_engines
+from app.events import async_event_stream, DEFAULT_KEEPALIVE
+from app.metrics import instrument_engine, record_request
+from app.models.incident import Incident
+from app.models.archive import ArchivedIncident
+from app.queries import filter_incidents, parse_fields, parse_limit, projected_columns, after_cursor, \
+    keyset_order, trim_page, row_to_dict, incident_statement
+from app.replicas import pick_replica
+from app.proxy import forwarded_addr
+from app.ratelimit import MemoryBuckets, client_key, queue_seconds, rejection, request_budget
+from app.principals import user_statement, token_statement, user_principal, token_principal, hash_token, \
+    bearer_token, cached_principal, remember_principal, principal_generation
+from app.sync import make_etag, with_etag, collection_version_statement, latest_change_statement, sync_token
+
+DEFAULT_WSGI_THREADS = 64
+
+class AsyncAPI:
+    # ASGI entry point. The hottest read-only JSON routes are served by the
+    # async handlers below on an async SQLAlchemy engine, so a slow query
+    # holds a coroutine rather than a thread. Everything else, HTML pages
+    # and writes included, falls through to the Flask app on a thread pool.
+    #
+    #     uvicorn asgi:app --workers 1
+    #
+    # The handlers answer exactly like their Flask twins in app/routes/api.py;
+    # keep the two in step. A request they can't answer the same way, such
+    # as one signed in only by the remember-me cookie, goes to the twin.
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WSGIMiddleware(app, workers=app.config.get('ASGI_WSGI_THREADS', DEFAULT_WSGI_THREADS))
+        self.engines = create_async_engines(app)
+        self.metrics = app.extensions.get('metrics')
+        if self.metrics:
+            for key, engine in self.engines.items():
+                instrument_engine(self.metrics, engine.sync_engine, key or 'primary')
+        self.sessions = async_sessionmaker(expire_on_commit=False)
+        self.url_map = Map([
+            Rule('/api/incidents', endpoint='get_incidents', methods=['GET']),
+            Rule('/api/incidents/<int:incident_id>', endpoint='get_incident', methods=['GET']),
+            Rule('/api/stream', endpoint='stream', methods=['GET'])
+        ])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http':
+            try:
+                endpoint, args = self.url_map.bind('localhost').match(scope['path'], scope['method'])
+            except HTTPException:
+                endpoint = None
+            if endpoint:
+                start = time.perf_counter()
+                request = AsyncRequest(scope, self.app)
+                handler = getattr(self, endpoint)
+                response = await handler(request, **args)
+                if isinstance(response, EventStream):
+                    return await response(receive, send)
+                if response is not None:
+                    if self.metrics:
+                        record_request(self.metrics, f'api.{endpoint}', scope['method'], response.status_code,
+                                       time.perf_counter() - start)
+                    return await send_response(send, response)
+
+        return await self.wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines.values():
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def session(self, request):
+        # Same replica choice and read-your-writes stickiness as @read_only
+        replica = pick_replica(self.app.extensions.get('db_replicas'), request.session.get('db_primary_until', 0))
+        return self.sessions(bind=self.engines[replica])
+
+    def remembered_only(self, request):
+        # No session user but Flask-Login's remember cookie: only the Flask
+        # view signs that browser back in and renews its session cookie
+        name = self.app.config.get('REMEMBER_COOKIE_NAME', COOKIE_NAME)
+        return request.session.get('_user_id') is None and name in request.cookies
+
+    async def current_user(self, request, session):
+        # The session user or else a bearer token, through the same principal
+        # cache as the Flask loaders; only a cache miss awaits the database
+        user_id = request.session.get('_user_id')
+        token = bearer_token(request.headers.get('authorization')) if user_id is None else None
+        if user_id is not None:
+            key = ('user', int(user_id))
+        elif token:
+            key = ('token', hash_token(token))
+        else:
+            return None
+
+        principal = cached_principal(key)
+        if principal:
+            return principal
+
+        generation = principal_generation()
+        if user_id is not None:
+            row = (await session.execute(user_statement(key[1]))).first()
+            principal, expires_at = user_principal(row), None
+        else:
+            row = (await session.execute(token_statement(key[1]))).first()
+            principal, expires_at = token_principal(row)
+        return remember_principal(key, principal, generation, self.app.config, expires_at)
+
+    async def authenticate(self, request, session, endpoint):
+        # Same answers as api_login_required for a read, then the same rate
+        # limits and load shedding as the Flask view
+        principal = await self.current_user(request, session)
+        if not principal:
+            return self.json({'error': 'Authentication required'}, 401)
+        if not principal.can('read'):
+            return self.json({'error': 'Token lacks the read scope'}, 403)
+
+        limiter = self.app.extensions.get('rate_limiter')
+        if not limiter:
+            return None
+        budget = request_budget(self.app.view_functions[f'api.{endpoint}'], 'GET')
+        args = (budget, client_key(principal, request.client_addr), queue_seconds(request.headers.get('x-request-start')))
+        if isinstance(limiter.backend, MemoryBuckets):
+            result = limiter.check(*args)
+        else:
+            # A shared backend is a network round trip; keep it off the event loop
+            result = await asyncio.to_thread(limiter.check, *args)
+        if result is None:
+            return None
+
+        status, retry_after = result
+        response = self.json(rejection(self.metrics, budget, status, retry_after), status)
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def json(self, data, status=200):
+        response = self.app.json.response(data)
+        response.status_code = status
+        return response
+
+    def not_modified(self, request, etag):
+        if request.if_none_match.contains(etag):
+            return with_etag(self.app.response_class(status=304), etag)
+        return None
+
+    async def get_incidents(self, request):
+        args = request.args
+        # Delta sync and NDJSON streaming stay with the Flask view
+        if args.get('updated_since') or args.get('format') == 'ndjson' or \
+                'application/x-ndjson' in request.headers.get('accept', '') or self.remembered_only(request):
+            return None
+
+        async with self.session(request) as session:
+            error = await self.authenticate(request, session, 'get_incidents')
+            if error:
+                return error
+
+            cursor = args.get('cursor', '')
+            try:
+                fields = parse_fields(args.get('fields', ''))
+                limit = parse_limit(args.get('limit', ''))
+                statement = filter_incidents(select(*projected_columns(fields)), args.get('status', ''),
+                                             args.get('priority', ''), args.get('type', ''))
+                statement = after_cursor(statement, cursor)
+            except ValueError as e:
+                return self.json({'error': str(e)}, 400)
+
+            version = tuple((await session.execute(collection_version_statement())).one())
+            etag = make_etag('incidents', request.full_path, version)
+            response = self.not_modified(request, etag)
+            if response:
+                return response
+
+            result = await session.execute(keyset_order(statement).limit(limit + 1))
+            rows, next_cursor = trim_page(result.all(), limit)
+            latest = None if cursor else (await session.execute(latest_change_statement())).first()
+
+        data = {
+            'incidents': [row_to_dict(row, fields) for row in rows],
+            'next_cursor': next_cursor
+        }
+        if not cursor:
+            data['sync_token'] = sync_token(*(latest or (None, 0)), self.app.config)
+        return with_etag(self.json(data), etag)
+
+    async def get_incident(self, request, incident_id):
+        if self.remembered_only(request):
+            return None
+        async with self.session(request) as session:
+            error = await self.authenticate(request, session, 'get_incident')
+            if error:
+                return error
+
+            row = (await session.execute(incident_statement(Incident, incident_id))).first() or \
+                (await session.execute(incident_statement(ArchivedIncident, incident_id))).first()
+            if not row:
+                return self.json({'error': 'Incident not found'}, 404)
+
+            etag = make_etag('incident', row.id, row.updated_at)
+            response = self.not_modified(request, etag)
+            if response:
+                return response
+            return with_etag(self.json(row._asdict()), etag)
+
+    async def stream(self, request):
+        # The live feed of api.stream, with each client a coroutine waiting
+        # on the event bus instead of a thread
+        if self.remembered_only(request):
+            return None
+        async with self.session(request) as session:
+            error = await self.authenticate(request, session, 'stream')
+        if error:
+            return error
+
+        last_event_id = request.headers.get('last-event-id') or request.args.get('last_event_id')
+        keepalive = self.app.config.get('STREAM_KEEPALIVE', DEFAULT_KEEPALIVE)
+        return EventStream(async_event_stream(self.app.extensions['event_bus'], last_event_id, keepalive))
+
+class EventStream:
+    # A text/event-stream response sent frame by frame until the client
+    # disconnects
+
+    headers = [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+               (b'x-accel-buffering', b'no')]
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def __call__(self, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': self.headers})
+        disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            while True:
+                frame = asyncio.ensure_future(anext(self.frames))
+                await asyncio.wait({frame, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    frame.cancel()
+                    await asyncio.wait({frame})
+                    return
+                await send({'type': 'http.response.body', 'body': frame.result().encode(), 'more_body': True})
+        finally:
+            disconnected.cancel()
+            await self.frames.aclose()
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+class AsyncRequest:
+    # The parts of a Flask request the async handlers need, read off the
+    # ASGI scope, including the signed Flask session cookie
+
+    def __init__(self, scope, app):
+        self.headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        self.cookies = parse_cookie(self.headers.get('cookie', ''))
+        query_string = scope['query_string'].decode('latin-1')
+        self.args = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+        self.full_path = f'{scope["path"]}?{query_string}'
+        # Found the same way as ProxyFix finds it for the Flask routes
+        self.client_addr = forwarded_addr(scope['client'][0] if scope.get('client') else None,
+                                          self.headers.get('x-forwarded-for'), app.config.get('PROXY_FIX_HOPS', 0))
+        self.session = self._load_session(app)
+
+    def _load_session(self, app):
+        cookie = self.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        serializer = app.session_interface.get_signing_serializer(app)
+        if not cookie or serializer is None:
+            return {}
+        try:
+            return serializer.loads(cookie, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return {}
+
+    @property
+    def if_none_match(self):
+        return parse_etags(self.headers.get('if-none-match'))
+
+async def send_response(send, response):
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()]
+    await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': response.get_data()})
@@ -0,0 +1,122 @@
+# app/database.py
+from flask import g, has_app_context
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Full-text search tables are managed by hand, see app/search.py
+    return not (type_ == 'table' and reflected and compare_to is None and '_fts' in name)
+
+class RoutingSession(Session):
+    # Sends plain reads to the replica engine a read-only request picked (see
+    # app/replicas.py). Flushes, DML and anything outside such a request keep
+    # using the primary.
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('db_replica') if has_app_context() else None
+        if replica and bind is None and not self._flushing and _is_read(clause):
+            return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _is_read(clause):
+    if clause is None or isinstance(clause, UpdateBase):
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() in ('SELECT', 'WITH')
+    return True
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate(include_object=include_object)
+
+def engine_options(config, url):
+    # Pool settings for server databases; SQLite gets its pragmas, busy
+    # timeout included, from set_sqlite_pragmas instead
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+    }
+
+def set_sqlite_pragmas(config, memory):
+    journal_mode = config.get('SQLITE_JOURNAL_MODE', 'WAL')
+    synchronous = config.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    busy_timeout = int(config.get('SQLITE_BUSY_TIMEOUT', 5000))
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # In-memory databases have no journal file to switch to WAL
+        if not memory:
+            cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.close()
+    return on_connect
+
+def init_db(app):
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS still win over the derived ones
+    options = engine_options(app.config, app.config['SQLALCHEMY_DATABASE_URI'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    # Each read replica becomes a replica_<n> bind with the same engine options
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    replicas = []
+    for index, url in enumerate(app.config.get('DATABASE_REPLICA_URLS') or ()):
+        key = f'replica_{index}'
+        binds[key] = dict(engine_options(app.config, url), url=url)
+        replicas.append(key)
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['db_replicas'] = replicas
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                memory = engine.url.database in (None, '', ':memory:')
+                event.listen(engine, 'connect', set_sqlite_pragmas(app.config, memory))
+
+# Async drivers for the ASGI API (see app/asgi.py), by sync driver name
+ASYNC_DRIVERS = {
+    'pysqlite': 'sqlite+aiosqlite',
+    'psycopg': 'postgresql+psycopg_async'
+}
+
+def async_url(url):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_driver_name())
+    if driver is None:
+        raise ValueError(f'No async driver for {url.drivername}')
+    return url.set(drivername=driver)
+
+def create_async_engines(app):
+    # Async twins of the primary and replica engines, keyed like db.engines
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    # Flask-SQLAlchemy resolves relative SQLite paths into the instance
+    # folder, so take the URLs from the engines it built
+    with app.app_context():
+        urls = {key: engine.url for key, engine in db.engines.items()}
+
+    engines = {}
+    for key, url in urls.items():
+        if key is None:
+            options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        else:
+            options = engine_options(app.config, url)
+        engine = create_async_engine(async_url(url), **options)
+        if engine.dialect.name == 'sqlite':
+            memory = engine.url.database in (None, '', ':memory:')
+            event.listen(engine.sync_engine, 'connect', set_sqlite_pragmas(app.config, memory))
+        engines[key] = engine
+    return engines
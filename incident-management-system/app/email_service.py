@@ -1,46 +1,424 @@
 # app/email_service.py
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
 from flask_mail import Mail, Message
 from flask import current_app, render_template
-from threading import Thread
 
 mail = Mail()
 
+# Marks the end of the queue for a worker during shutdown
+_STOP = object()
+
+class NotificationDispatcher:
+    # Delivers queued messages from a fixed pool of worker threads. Each worker
+    # keeps one SMTP connection open for as long as the queue keeps it busy.
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config.get('MAIL_WORKERS', 2)
+        self.enqueue_timeout = app.config.get('MAIL_ENQUEUE_TIMEOUT', 2.0)
+        self.batch_idle = app.config.get('MAIL_BATCH_IDLE', 0.5)
+        self.max_retries = app.config.get('MAIL_MAX_RETRIES', 3)
+        self.retry_backoff = app.config.get('MAIL_RETRY_BACKOFF', 1.0)
+        self._queue = queue.Queue(maxsize=app.config.get('MAIL_QUEUE_SIZE', 1000))
+        self._threads = []
+        self._lock = threading.Lock()
+        self._accepting = True
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'mail-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.shutdown)
+
+    def submit(self, message):
+        if not self._accepting:
+            self.dropped += 1
+            return False
+
+        self.start()
+
+        # Block the caller briefly when the queue is full so bursts slow down
+        # producers instead of growing without bound
+        try:
+            self._queue.put(message, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.dropped += 1
+            self.app.logger.warning('Notification queue full, dropping "%s"', message.subject)
+            return False
+        return True
+
+    def shutdown(self, timeout=None):
+        if timeout is None:
+            timeout = self.app.config.get('MAIL_SHUTDOWN_TIMEOUT', 10.0)
+
+        with self._lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            threads = list(self._threads)
+
+        # Workers drain everything queued ahead of their stop marker
+        for _ in threads:
+            self._queue.put(_STOP)
+
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    def _next(self):
+        try:
+            return self._queue.get(timeout=self.batch_idle)
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                message = self._queue.get()
+                if message is _STOP:
+                    self._queue.task_done()
+                    return
+                if self._send_batch(message):
+                    return
+
+    def _send_batch(self, message):
+        # Returns True when the stop marker was reached while batching
+        stopped = False
+        attempt = 0
+
+        while message is not None:
+            try:
+                with mail.connect() as conn:
+                    while message is not None:
+                        conn.send(message)
+                        self.sent += 1
+                        self._queue.task_done()
+                        attempt = 0
+
+                        message = self._next()
+                        if message is _STOP:
+                            self._queue.task_done()
+                            stopped = True
+                            message = None
+            except (smtplib.SMTPException, OSError) as e:
+                if message is None:
+                    break
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._give_up(message, e)
+                    message = None
+                else:
+                    time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            except Exception as e:
+                # Malformed messages won't get better by retrying
+                if message is None:
+                    break
+                self._give_up(message, e)
+                message = None
+
+        return stopped
+
+    def _give_up(self, message, error):
+        self.failed += 1
+        self._queue.task_done()
+        self.app.logger.error('Failed to send "%s" to %s: %s', message.subject, message.recipients, error)
+
+# Template base name and subject for each notification kind
+NOTIFICATION_KINDS = {
+    'created': ('emails/incident_notification', 'New Incident: {title}'),
+    'assigned': ('emails/assignment_notification', 'Incident Assigned: {title}'),
+    'status': ('emails/status_update_notification', 'Incident Status Update: {title}'),
+}
+
+EVENT_LABELS = {
+    'created': 'Incident reported',
+    'assigned': 'Incident assigned',
+    'status': 'Status changed to {status}',
+}
+
+class NotificationEvent:
+    __slots__ = ('kind', 'status', 'at')
+
+    def __init__(self, kind, status, at):
+        self.kind = kind
+        self.status = status
+        self.at = at
+
+    @property
+    def label(self):
+        return EVENT_LABELS[self.kind].format(status=self.status)
+
+def snapshot_incident(incident):
+    # Detached copy of the fields the email templates read, safe to render later
+    # from another thread
+    return SimpleNamespace(
+        id=incident.id,
+        title=incident.title,
+        description=incident.description,
+        priority=incident.priority,
+        status=incident.status,
+        incident_type=incident.incident_type,
+        created_at=incident.created_at,
+        updated_at=incident.updated_at,
+        resolved_at=incident.resolved_at
+    )
+
+def digest_recipients(recipients):
+    # The subset of recipients who chose digest delivery
+    from app.recipients import digest_emails
+
+    digests = digest_emails()
+    return {recipient for recipient in recipients if recipient in digests}
+
+class NotificationCoalescer:
+    # The first event for a (recipient, incident) is sent straight away and opens a
+    # MAIL_COALESCE_WINDOW; anything else for that pair during the window goes out as
+    # one message when it closes, which opens the next window. An incident that flaps
+    # during an outage costs a recipient one email per window instead of one per
+    # change, while a new incident or assignment still pages without delay. Recipients
+    # who chose digest delivery get everything rolled up every MAIL_DIGEST_INTERVAL.
+
+    def __init__(self, app, dispatcher):
+        self.app = app
+        self.dispatcher = dispatcher
+        self.window = app.config.get('MAIL_COALESCE_WINDOW', 30)
+        self.digest_interval = app.config.get('MAIL_DIGEST_INTERVAL', 3600)
+        # (key, entry) pairs to send now, then the open windows:
+        # (recipient, incident_id) -> entry, due in insertion order
+        self._immediate = []
+        self._pending = {}
+        # recipient -> {incident_id: entry}
+        self._digests = {}
+        self._next_digest = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = True
+
+    def add(self, kind, incident, recipients):
+        snapshot = snapshot_incident(incident)
+        event = NotificationEvent(kind, snapshot.status, datetime.utcnow())
+        due = time.monotonic() + self.window
+        digest = digest_recipients(recipients)
+
+        with self._cond:
+            for recipient in recipients:
+                key = (recipient, snapshot.id)
+                if recipient in digest:
+                    self._add_to_digest(recipient, snapshot.id, {'incident': snapshot, 'events': [event]})
+                    continue
+                entry = self._pending.get(key)
+                if entry is None:
+                    self._immediate.append((key, {'incident': snapshot, 'events': [event]}))
+                    if self.window > 0:
+                        self._pending[key] = {'due': due, 'incident': snapshot, 'events': []}
+                else:
+                    entry['incident'] = snapshot
+                    entry['events'].append(event)
+            self._start()
+            self._cond.notify()
+
+    def add_to_digests(self, recipients, incidents):
+        # Queues already-created incidents for the recipients' next digest
+        at = datetime.utcnow()
+        for recipient in recipients:
+            for incident in incidents:
+                event = NotificationEvent('created', incident.status, at)
+                self._add_to_digest(recipient, incident.id, {'incident': incident, 'events': [event]})
+        with self._cond:
+            self._start()
+            self._cond.notify()
+
+    def _start(self):
+        if self._thread is None:
+            # Start the dispatcher first so its exit hook runs after ours
+            self.dispatcher.start()
+            self._thread = threading.Thread(target=self._run, name='mail-coalescer', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _take_due(self, now, final=False):
+        due, self._immediate = self._immediate, []
+        while self._pending:
+            key, entry = next(iter(self._pending.items()))
+            if entry['due'] > now:
+                break
+            del self._pending[key]
+            if not entry['events']:
+                continue  # a quiet window just closes
+            due.append((key, entry))
+            if not final:
+                # Later windows open at the back, so the order still holds
+                self._pending[key] = {'due': now + self.window, 'incident': entry['incident'], 'events': []}
+        return due
+
+    def _take_digests(self, now):
+        if self._next_digest is None or self._next_digest > now:
+            return {}
+        digests, self._digests = self._digests, {}
+        self._next_digest = None
+        return digests
+
+    def _wait_time(self, now):
+        deadlines = []
+        if self._pending:
+            deadlines.append(next(iter(self._pending.values()))['due'])
+        if self._next_digest is not None:
+            deadlines.append(self._next_digest)
+        return max(0, min(deadlines) - now) if deadlines else None
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                with self._cond:
+                    if not self._running:
+                        return
+                    now = time.monotonic()
+                    due = self._take_due(now)
+                    digests = self._take_digests(now)
+                    if not due and not digests:
+                        self._cond.wait(self._wait_time(now))
+                        continue
+                try:
+                    self._deliver(due)
+                    self._deliver_digests(digests)
+                except Exception:
+                    self.app.logger.exception('Failed to deliver coalesced notifications')
+
+    def _deliver(self, due):
+        if not due:
+            return
+
+        # Recipients who saw exactly the same events for an incident share one render
+        groups = {}
+        for (recipient, incident_id), entry in due:
+            key = (incident_id, tuple((event.kind, event.status) for event in entry['events']))
+            group = groups.setdefault(key, {'entry': entry, 'recipients': []})
+            group['recipients'].append(recipient)
+
+        for group in groups.values():
+            entry = group['entry']
+            events = entry['events']
+            if len(events) == 1:
+                template, subject = NOTIFICATION_KINDS[events[0].kind]
+                context = {'incident': entry['incident']}
+            else:
+                template = 'emails/incident_summary'
+                subject = f'Incident Update: {{title}} ({len(events)} changes)'
+                context = {'incident': entry['incident'], 'events': events}
+            send_email(
+                subject=subject.format(title=entry['incident'].title),
+                recipients=group['recipients'],
+                text_body=render_template(f'{template}.txt', **context),
+                html_body=render_template(f'{template}.html', **context)
+            )
+
+    def _add_to_digest(self, recipient, incident_id, entry):
+        with self._cond:
+            incidents = self._digests.setdefault(recipient, {})
+            if incident_id in incidents:
+                incidents[incident_id]['events'].extend(entry['events'])
+                incidents[incident_id]['incident'] = entry['incident']
+            else:
+                incidents[incident_id] = entry
+            if self._next_digest is None:
+                self._next_digest = time.monotonic() + self.digest_interval
+
+    def _deliver_digests(self, digests):
+        for recipient, incidents in digests.items():
+            entries = list(incidents.values())
+            send_email(
+                subject=f'Incident Digest: {len(entries)} incident(s) updated',
+                recipients=[recipient],
+                text_body=render_template('emails/digest.txt', entries=entries),
+                html_body=render_template('emails/digest.html', entries=entries)
+            )
+
+    def shutdown(self):
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+        # Send whatever is still waiting rather than losing it
+        with self.app.app_context():
+            with self._cond:
+                due = self._take_due(float('inf'), final=True)
+            self._deliver(due)
+            with self._cond:
+                self._next_digest = 0
+                digests = self._take_digests(float('inf'))
+            self._deliver_digests(digests)
+        self.dispatcher.shutdown()
+
 def init_mail(app):
     mail.init_app(app)
+    dispatcher = NotificationDispatcher(app)
+    app.extensions['notification_dispatcher'] = dispatcher
+    app.extensions['notification_coalescer'] = NotificationCoalescer(app, dispatcher)
 
-def send_async_email(app, msg):
-    with app.app_context():
-        mail.send(msg)
+def get_dispatcher():
+    return current_app.extensions['notification_dispatcher']
 
 def send_email(subject, recipients, text_body, html_body=None):
     msg = Message(subject, recipients=recipients)
     msg.body = text_body
     if html_body:
         msg.html = html_body
-    
-    # Send email asynchronously to avoid blocking the main thread
-    Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
+
+    # Hand the message to the worker pool to avoid blocking the request
+    return get_dispatcher().submit(msg)
+
+def notify(kind, incident, recipients):
+    # Always through the coalescer, which honours digest delivery; with a
+    # window of 0 it sends every event on its own
+    current_app.extensions['notification_coalescer'].add(kind, incident, recipients)
 
 def send_incident_notification(incident, recipients):
-    send_email(
-        subject=f"New Incident: {incident.title}",
-        recipients=recipients,
-        text_body=render_template("emails/incident_notification.txt", incident=incident),
-        html_body=render_template("emails/incident_notification.html", incident=incident)
-    )
+    notify('created', incident, recipients)
 
 def send_assignment_notification(incident, recipients):
-    send_email(
-        subject=f"Incident Assigned: {incident.title}",
-        recipients=recipients,
-        text_body=render_template("emails/assignment_notification.txt", incident=incident),
-        html_body=render_template("emails/assignment_notification.html", incident=incident)
-    )
+    notify('assigned', incident, recipients)
 
 def send_status_update_notification(incident, recipients):
+    notify('status', incident, recipients)
+
+def send_bulk_incident_notification(incidents, recipients):
+    # Bulk ingestion already batches its events, so bypass the coalescer and
+    # send a single summary listing the first MAIL_BULK_LISTING incidents;
+    # digest recipients get the new incidents in their next digest instead
+    incidents = [SimpleNamespace(**incident) for incident in incidents]
+    digest = digest_recipients(recipients)
+    if digest:
+        current_app.extensions['notification_coalescer'].add_to_digests(sorted(digest), incidents)
+        recipients = [recipient for recipient in recipients if recipient not in digest]
+        if not recipients:
+            return
+
+    listing = current_app.config.get('MAIL_BULK_LISTING', 50)
+    context = {'incidents': incidents[:listing], 'total': len(incidents)}
     send_email(
-        subject=f"Incident Status Update: {incident.title}",
+        subject=f"{len(incidents)} New Incidents Reported",
         recipients=recipients,
-        text_body=render_template("emails/status_update_notification.txt", incident=incident),
-        html_body=render_template("emails/status_update_notification.html", incident=incident)
-    )
\ No newline at end of file
+        text_body=render_template("emails/bulk_incident_notification.txt", **context),
+        html_body=render_template("emails/bulk_incident_notification.html", **context)
+    )
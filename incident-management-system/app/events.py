@@ -0,0 +1,153 @@
+# app/events.py
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from itertools import islice
+from flask import current_app
+
+DEFAULT_REPLAY_SIZE = 1000
+DEFAULT_KEEPALIVE = 15
+# Streams served from WSGI threads, beyond which clients are told to retry
+# later; under ASGI (app/asgi.py) streams hold no thread and aren't capped
+DEFAULT_WSGI_STREAMS = 16
+
+class EventBus:
+    # In-process pub/sub for the live incident feed. Each event is encoded as an
+    # SSE frame once, when it is published, and every subscriber reads the same
+    # frame out of a bounded replay buffer, so a change costs one broadcast no
+    # matter how many dashboards are open.
+    #
+    # Ids count up from 1 in each process, so every id carries the process's
+    # epoch ("<epoch>-<n>"); a client resuming with an id from another epoch,
+    # after a restart or from another worker, is told to reload.
+
+    def __init__(self, replay_size=DEFAULT_REPLAY_SIZE):
+        self._buffer = deque(maxlen=replay_size)
+        self._cond = threading.Condition()
+        self._last_id = 0
+        self._async_waiters = set()
+        self.epoch = secrets.token_hex(4)
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def event_id(self, n):
+        return f'{self.epoch}-{n}'
+
+    def publish(self, event_type, data):
+        with self._cond:
+            self._last_id += 1
+            payload = json.dumps(data, separators=(',', ':'), default=str)
+            frame = f'id: {self.event_id(self._last_id)}\nevent: {event_type}\ndata: {payload}\n\n'
+            self._buffer.append((self._last_id, frame))
+            self._cond.notify_all()
+            for loop, waiter in self._async_waiters:
+                loop.call_soon_threadsafe(waiter.set)
+            return self._last_id
+
+    def resume_from(self, last_event_id):
+        # The number of the last event a client saw, from its Last-Event-ID;
+        # the newest event for a new client, None for an id of another epoch
+        if not last_event_id:
+            return self._last_id
+        epoch, _, n = last_event_id.rpartition('-')
+        if epoch != self.epoch or not n.isdigit() or int(n) > self._last_id:
+            return None
+        return int(n)
+
+    def _since(self, last_id):
+        if not self._buffer:
+            return []
+        # Ids are contiguous, so the first unseen event sits at a known offset;
+        # None means the client fell further behind than the buffer reaches
+        first_id = self._buffer[0][0]
+        if last_id < first_id - 1:
+            return None
+        return list(islice(self._buffer, max(0, last_id - first_id + 1), None))
+
+    def wait(self, last_id, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_id > last_id, timeout)
+            return self._since(last_id)
+
+    async def wait_async(self, last_id, timeout):
+        # wait() for the event loop: publishers run on other threads and wake
+        # the loop, so a waiting client costs a coroutine rather than a thread
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            if self._last_id > last_id:
+                return self._since(last_id)
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+        with self._cond:
+            return self._since(last_id)
+
+def _reset(bus):
+    last_id = bus.last_id
+    return last_id, f'id: {bus.event_id(last_id)}\nevent: reset\ndata: {{}}\n\n'
+
+def _frames(bus, last_id, events):
+    # (new last_id, text to send) for what one wait returned
+    if events is None:
+        return _reset(bus)
+    if events:
+        return events[-1][0], ''.join(frame for _, frame in events)
+    return last_id, ': keepalive\n\n'
+
+def event_stream(bus, last_event_id, keepalive):
+    # The SSE body for one client, from a WSGI thread
+    last_id = bus.resume_from(last_event_id)
+    if last_id is None:
+        last_id, frame = _reset(bus)
+        yield frame
+    yield f'retry: {keepalive * 1000}\n\n'
+
+    while True:
+        last_id, frame = _frames(bus, last_id, bus.wait(last_id, keepalive))
+        yield frame
+
+async def async_event_stream(bus, last_event_id, keepalive):
+    # The same body for the ASGI handler
+    last_id = bus.resume_from(last_event_id)
+    if last_id is None:
+        last_id, frame = _reset(bus)
+        yield frame
+    yield f'retry: {keepalive * 1000}\n\n'
+
+    while True:
+        last_id, frame = _frames(bus, last_id, await bus.wait_async(last_id, keepalive))
+        yield frame
+
+def init_events(app):
+    app.extensions['event_bus'] = EventBus(app.config.get('EVENT_REPLAY_SIZE', DEFAULT_REPLAY_SIZE))
+    app.extensions['event_stream_slots'] = threading.BoundedSemaphore(
+        app.config.get('STREAM_MAX_WSGI_CLIENTS', DEFAULT_WSGI_STREAMS))
+
+def get_event_bus():
+    return current_app.extensions['event_bus']
+
+def publish_incident_event(event_type, incident, **extra):
+    data = incident.to_dict()
+    # The description can be long and the feed only patches summary fields
+    data.pop('description', None)
+    data.update(extra)
+    get_event_bus().publish(event_type, data)
+
+def publish_comment_event(comment, author_name):
+    get_event_bus().publish('comment_added', {
+        'id': comment.id,
+        'incident_id': comment.incident_id,
+        'content': comment.content,
+        'author_id': comment.author_id,
+        'author_name': author_name,
+        'created_at': comment.created_at.isoformat()
+    })
@@ -0,0 +1,147 @@
+# app/export.py
+import csv
+import io
+import sys
+from datetime import datetime
+import click
+from sqlalchemy import DateTime, Integer, select
+from app.database import db
+from app.models.incident import Incident
+from app.models.incident_event import IncidentEvent
+from app.serialization import dumps
+
+DEFAULT_EXPORT_CHUNK = 10000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+EXPORT_DATASETS = {
+    'incidents': Incident.__table__,
+    'events': IncidentEvent.__table__
+}
+
+def export_statement(dataset='incidents', status='', priority='', incident_type=''):
+    # Same filters as list_incidents, on plain columns so no ORM objects are built
+    table = EXPORT_DATASETS[dataset]
+    statement = select(table).order_by(table.c.id)
+    if status and 'status' in table.c:
+        statement = statement.where(table.c.status == status)
+    if priority:
+        statement = statement.where(table.c.priority == priority)
+    if incident_type:
+        statement = statement.where(table.c.incident_type == incident_type)
+    return statement
+
+def iter_chunks(statement, chunk_size=DEFAULT_EXPORT_CHUNK):
+    # yield_per streams from a server-side cursor where the driver has one, so
+    # at most one chunk of rows is in memory at a time
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield partition
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def write_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows([_plain(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def write_ndjson(columns, chunks):
+    for rows in chunks:
+        yield b''.join(dumps(dict(zip(columns, row))) + b'\n' for row in rows)
+
+class _Drain:
+    # Write-only file object that hands back whatever was written since the
+    # last drain, so the Parquet writer never holds more than one row group
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+def write_parquet(columns, chunks, table):
+    # Imported here so the rest of the app doesn't pay for pyarrow at startup
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def arrow_type(column):
+        if isinstance(column.type, Integer):
+            return pa.int64()
+        if isinstance(column.type, DateTime):
+            return pa.timestamp('us')
+        return pa.string()
+
+    schema = pa.schema([(name, arrow_type(table.c[name])) for name in columns])
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+
+    # One Arrow record batch, and so one row group, per chunk
+    for rows in chunks:
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+def export_rows(format, dataset='incidents', status='', priority='', incident_type='', chunk_size=DEFAULT_EXPORT_CHUNK):
+    # Yields the export as byte strings, one chunk of rows at a time
+    table = EXPORT_DATASETS[dataset]
+    columns = [column.name for column in table.columns]
+    chunks = iter_chunks(export_statement(dataset, status, priority, incident_type), chunk_size)
+
+    if format == 'csv':
+        return write_csv(columns, chunks)
+    if format == 'ndjson':
+        return write_ndjson(columns, chunks)
+    return write_parquet(columns, chunks, table)
+
+def init_export(app):
+    @app.cli.command('export-incidents')
+    @click.option('--format', 'format', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+    @click.option('--dataset', type=click.Choice(list(EXPORT_DATASETS)), default='incidents')
+    @click.option('--output', '-o', type=click.Path(dir_okay=False), help='File to write; defaults to stdout.')
+    @click.option('--status', default='')
+    @click.option('--priority', default='')
+    @click.option('--type', 'incident_type', default='')
+    @click.option('--chunk-size', type=int, default=DEFAULT_EXPORT_CHUNK)
+    def export_incidents(format, dataset, output, status, priority, incident_type, chunk_size):
+        """Export incidents or incident events as CSV, NDJSON or Parquet."""
+        out = open(output, 'wb') if output else sys.stdout.buffer
+        try:
+            for data in export_rows(format, dataset, status, priority, incident_type, chunk_size):
+                out.write(data)
+        finally:
+            if output:
+                out.close()
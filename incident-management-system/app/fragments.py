@@ -0,0 +1,111 @@
+# app/fragments.py
+import threading
+from collections import OrderedDict
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_SIZE = 32 * 1024 * 1024  # characters of rendered HTML
+
+class FragmentCache:
+    # Bounded LRU of rendered template fragments. Keys carry the version of
+    # what they render, e.g. (name, incident.id, incident.updated_at, role),
+    # so a changed incident simply misses and its stale entries age out;
+    # nothing needs invalidating.
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_size=DEFAULT_MAX_SIZE):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def set(self, key, html):
+        if len(html) > self.max_size:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = html
+            self.size += len(html)
+            while len(self._entries) > self.max_entries or self.size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+class FragmentCacheExtension(Extension):
+    # {% cache_fragment 'list-row', incident.id, incident.updated_at, current_user.role %}
+    #     ...
+    # {% endcache_fragment %}
+    #
+    # Renders the body once per distinct key. Everything the body shows must
+    # be covered by the key; incident fragments rely on updated_at changing
+    # with every edit, comment counters included.
+    tags = {'cache_fragment'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache_fragment',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.Tuple(key, 'load')]), [], [], body) \
+            .set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        html = cache.get(key)
+        if html is None:
+            html = caller()
+            cache.set(key, html)
+        return html
+
+def init_fragments(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+    # Compiled templates survive restarts, so a fresh worker skips parsing
+    # and compiling them on its first renders
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config.get('JINJA_BYTECODE_CACHE_DIR'))
+
+    max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    if not max_entries:
+        return
+    cache = FragmentCache(max_entries, app.config.get('FRAGMENT_CACHE_MAX_SIZE', DEFAULT_MAX_SIZE))
+    app.jinja_env.fragment_cache = cache
+    app.extensions['fragment_cache'] = cache
+
+    metrics = app.extensions.get('metrics')
+    if metrics:
+        metrics.add_callback('fragment_cache_entries', 'Rendered fragments cached.', lambda: len(cache))
+        metrics.add_callback('fragment_cache_size', 'Characters of rendered HTML cached.', lambda: cache.size)
+        metrics.add_callback('fragment_cache_hits_total', 'Fragments served from the cache.', lambda: cache.hits,
+                             'counter')
+        metrics.add_callback('fragment_cache_misses_total', 'Fragments rendered afresh.', lambda: cache.misses,
+                             'counter')
@@ -0,0 +1,167 @@
+# app/ingest.py
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import bindparam, func, insert, select, update
+from app.database import db
+from app.models.incident import Incident
+from app.analytics import record_created_events
+
+PRIORITIES = ('low', 'medium', 'high', 'critical')
+REQUIRED_FIELDS = ('title', 'description', 'incident_type')
+DEFAULT_BULK_LIMIT = 10000
+
+# Incidents in these statuses absorb repeat alerts with the same fingerprint
+ACTIVE_STATUSES = ('open', 'in_progress')
+DEFAULT_FINGERPRINT_FIELDS = ('title', 'incident_type')
+FINGERPRINT_LOOKUP_CHUNK = 500
+
+def iter_payload(request):
+    # Yields (index, item, error) for a JSON array, {"incidents": [...]} or an
+    # NDJSON body, which is read line by line instead of being buffered whole
+    if request.mimetype == 'application/x-ndjson':
+        index = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield index, json.loads(line), None
+            except ValueError:
+                yield index, None, 'Invalid JSON'
+            index += 1
+        return
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('incidents')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of incidents or an NDJSON body')
+    for index, item in enumerate(data):
+        yield index, item, None
+
+def validate_incident(item):
+    if not isinstance(item, dict):
+        return 'Each incident must be a JSON object'
+    for field in REQUIRED_FIELDS:
+        if not item.get(field):
+            return f'Missing required field: {field}'
+        if not isinstance(item[field], str):
+            return f'{field} must be a string'
+    if len(item['title']) > Incident.title.type.length:
+        return f'title must be at most {Incident.title.type.length} characters'
+    if item.get('priority', 'medium') not in PRIORITIES:
+        return f'Invalid priority: {item["priority"]}'
+    return None
+
+def fingerprint_for(item):
+    if not current_app.config.get('INCIDENT_DEDUPLICATION', True):
+        return None
+
+    # Monitoring systems can send their own alert key; otherwise hash the
+    # configured fields so repeats of the same alert collide
+    if item.get('fingerprint'):
+        source = str(item['fingerprint'])
+    else:
+        fields = current_app.config.get('INCIDENT_FINGERPRINT_FIELDS', DEFAULT_FINGERPRINT_FIELDS)
+        source = '\x1f'.join(str(item.get(field) or '').strip().lower() for field in fields)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+def record_occurrence(fingerprint, count=1):
+    # Bumps the newest active incident with this fingerprint in a single
+    # indexed UPDATE ... RETURNING; returns None when there is nothing to bump
+    latest = select(func.max(Incident.id)).where(
+        Incident.fingerprint == fingerprint, Incident.status.in_(ACTIVE_STATUSES)
+    ).scalar_subquery()
+
+    result = db.session.execute(
+        update(Incident).where(Incident.id == latest).values(
+            occurrence_count=Incident.occurrence_count + count,
+            updated_at=datetime.utcnow()
+        ).returning(Incident),
+        execution_options={'synchronize_session': False}
+    )
+    return result.scalars().first()
+
+def _active_by_fingerprint(fingerprints):
+    existing = {}
+    fingerprints = list(fingerprints)
+    for start in range(0, len(fingerprints), FINGERPRINT_LOOKUP_CHUNK):
+        chunk = fingerprints[start:start + FINGERPRINT_LOOKUP_CHUNK]
+        existing.update(db.session.query(Incident.fingerprint, func.max(Incident.id)).filter(
+            Incident.fingerprint.in_(chunk), Incident.status.in_(ACTIVE_STATUSES)
+        ).group_by(Incident.fingerprint))
+    return existing
+
+def bulk_ingest_incidents(items, creator_id):
+    # Returns one {'id', 'duplicate'} result per item plus the rows that were
+    # actually inserted. Repeats inside the batch collapse onto one new row and
+    # repeats of active incidents only bump their occurrence counters.
+    fingerprints = [fingerprint_for(item) for item in items]
+    counts = Counter(fingerprint for fingerprint in fingerprints if fingerprint)
+    existing = _active_by_fingerprint(counts)
+
+    to_insert = []
+    first_index = {}
+    for index, (item, fingerprint) in enumerate(zip(items, fingerprints)):
+        if fingerprint is None:
+            to_insert.append((index, item, None, 1))
+        elif fingerprint not in existing and fingerprint not in first_index:
+            first_index[fingerprint] = index
+            to_insert.append((index, item, fingerprint, counts[fingerprint]))
+
+    if existing:
+        table = Incident.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(
+                occurrence_count=table.c.occurrence_count + bindparam('b_count'),
+                updated_at=datetime.utcnow()
+            ),
+            [{'b_id': incident_id, 'b_count': counts[fingerprint]} for fingerprint, incident_id in existing.items()]
+        )
+
+    inserted = bulk_insert_incidents(
+        [item for _, item, _, _ in to_insert], creator_id,
+        extra=[{'fingerprint': fingerprint, 'occurrence_count': count} for _, _, fingerprint, count in to_insert]
+    )
+    ids = {index: row['id'] for (index, _, _, _), row in zip(to_insert, inserted)}
+    new_ids = {fingerprint: ids[index] for fingerprint, index in first_index.items()}
+
+    results = []
+    for index, fingerprint in enumerate(fingerprints):
+        if index in ids:
+            results.append({'id': ids[index], 'duplicate': False})
+        else:
+            results.append({'id': existing.get(fingerprint) or new_ids[fingerprint], 'duplicate': True})
+    return results, inserted
+
+def bulk_insert_incidents(items, creator_id, extra=None):
+    # One multi-row INSERT per batch inside the caller's transaction; RETURNING
+    # hands back the new ids in parameter order
+    now = datetime.utcnow()
+    rows = [{
+        'title': item['title'],
+        'description': item['description'],
+        'priority': item.get('priority', 'medium'),
+        'incident_type': item['incident_type'],
+        'creator_id': creator_id,
+        'status': 'open',
+        'created_at': now,
+        'updated_at': now
+    } for item in items]
+    for row, values in zip(rows, extra or ()):
+        row.update(values)
+
+    if not rows:
+        return []
+
+    result = db.session.execute(
+        insert(Incident).returning(Incident.id, sort_by_parameter_order=True),
+        rows
+    )
+    for row, incident_id in zip(rows, result.scalars()):
+        row['id'] = incident_id
+    record_created_events(rows, creator_id)
+    return rows
@@ -0,0 +1,230 @@
+# app/metrics.py
+import hmac
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from flask import Response, before_render_template, current_app, g, has_request_context, jsonify, request, \
+    template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from app.database import db
+
+# Bucket upper bounds in seconds, or statements for the per-request SQL count
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+TEMPLATE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+DEFAULT_PROFILE_INTERVAL = 0.005
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+class Metrics:
+    # Per-process registry of counters, histograms and gauges, rendered in
+    # the Prometheus text format. Values another component already keeps,
+    # such as a queue length, are published with add_callback and read at
+    # scrape time.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}  # name -> (kind, help, buckets)
+        self._values = {}  # name -> {labels: number or Histogram}
+        self._callbacks = {}  # name -> callback
+
+    def counter(self, name, help):
+        self._families[name] = ('counter', help, None)
+        self._values[name] = {}
+
+    def histogram(self, name, help, buckets):
+        self._families[name] = ('histogram', help, buckets)
+        self._values[name] = {}
+
+    def add_callback(self, name, help, callback, kind='gauge'):
+        self._families[name] = (kind, help, None)
+        self._callbacks[name] = callback
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            histogram = values.get(key)
+            if histogram is None:
+                histogram = values[key] = Histogram(self._families[name][2])
+            histogram.observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help, buckets) in self._families.items():
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {kind}')
+                if name in self._callbacks:
+                    lines.append(f'{name} {self._callbacks[name]()}')
+                elif kind == 'counter':
+                    for labels, value in self._values[name].items():
+                        lines.append(f'{name}{_labels(labels)} {value}')
+                else:
+                    for labels, histogram in self._values[name].items():
+                        cumulative = 0
+                        for bound, count in zip(buckets + ('+Inf',), histogram.counts):
+                            cumulative += count
+                            lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                        lines.append(f'{name}_sum{_labels(labels)} {histogram.sum}')
+                        lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+class StackSampler:
+    # Samples one thread's Python stack every interval seconds and counts the
+    # stacks in the folded format flamegraph.pl and speedscope read:
+    # "outer;inner;innermost <samples>" per line
+
+    def __init__(self, thread_id, interval=DEFAULT_PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+def instrument_engine(metrics, engine, database):
+    # Times every statement on this engine; inside a request it also counts
+    # towards that request's SQL statement total
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+        metrics.observe('sql_statement_duration_seconds', elapsed, database=database)
+        if has_request_context() and 'metrics_sql_statements' in g:
+            g.metrics_sql_statements += 1
+
+def record_request(metrics, endpoint, method, status, seconds, statements=None):
+    metrics.inc('http_requests_total', endpoint=endpoint, method=method, status=status)
+    metrics.observe('http_request_duration_seconds', seconds, endpoint=endpoint, method=method)
+    if statements is not None:
+        metrics.observe('http_request_sql_statements', statements, endpoint=endpoint)
+
+def init_metrics(app):
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    if app.config.get('METRICS_REQUIRE_TOKEN') and not app.config.get('METRICS_TOKEN'):
+        raise RuntimeError('METRICS_TOKEN must be set, or METRICS_ENABLED turned off, to serve /metrics')
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    metrics.counter('http_requests_total', 'Requests handled, by endpoint, method and status.')
+    metrics.histogram('http_request_duration_seconds', 'Time until the view returned its response.',
+                      REQUEST_BUCKETS)
+    metrics.histogram('http_request_sql_statements', 'SQL statements run per request.', STATEMENT_COUNT_BUCKETS)
+    metrics.histogram('sql_statement_duration_seconds', 'SQL statement execution time, by database.', SQL_BUCKETS)
+    metrics.histogram('template_render_seconds', 'render_template time, by template.', TEMPLATE_BUCKETS)
+
+    dispatcher = app.extensions.get('notification_dispatcher')
+    if dispatcher:
+        metrics.add_callback('mail_queue_depth', 'Messages waiting for an SMTP worker.', lambda: dispatcher.depth)
+        metrics.add_callback('mail_sent_total', 'Messages delivered.', lambda: dispatcher.sent, 'counter')
+        metrics.add_callback('mail_failed_total', 'Messages given up on.', lambda: dispatcher.failed, 'counter')
+        metrics.add_callback('mail_dropped_total', 'Messages dropped on a full queue.', lambda: dispatcher.dropped,
+                             'counter')
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            instrument_engine(metrics, engine, key or 'primary')
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_statements = 0
+
+        # ?profile=1 lets an admin sample this request's stack
+        if request.args.get('profile') == '1' and current_user.is_authenticated and current_user.role == 'admin':
+            interval = app.config.get('PROFILE_SAMPLE_INTERVAL', DEFAULT_PROFILE_INTERVAL)
+            g.profiler = StackSampler(threading.get_ident(), interval).start()
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' in g:
+            record_request(metrics, request.endpoint or 'unmatched', request.method, response.status_code,
+                           time.perf_counter() - g.metrics_start, g.metrics_sql_statements)
+
+        # Streamed bodies are produced after this point, so a profile covers
+        # the view itself; the real response is swapped for the stack dump
+        profiler = g.pop('profiler', None)
+        if profiler:
+            profiler.stop()
+            samples = sum(profiler.stacks.values())
+            body = profiler.folded() or (f'No samples: the request finished within one '
+                                         f'{profiler.interval * 1000:g} ms sampling interval\n')
+            response = Response(body, mimetype='text/plain')
+            response.headers['X-Profile-Samples'] = str(samples)
+        return response
+
+    @before_render_template.connect_via(app)
+    def start_template_timer(sender, template, context, **extra):
+        g.setdefault('metrics_template_starts', []).append(time.perf_counter())
+
+    @template_rendered.connect_via(app)
+    def record_template_time(sender, template, context, **extra):
+        starts = g.get('metrics_template_starts')
+        if starts:
+            metrics.observe('template_render_seconds', time.perf_counter() - starts.pop(),
+                            template=template.name or 'string')
+
+    @app.route('/metrics', endpoint='metrics')
+    def metrics_endpoint():
+        # Set METRICS_TOKEN to require "Authorization: Bearer <token>"
+        token = app.config.get('METRICS_TOKEN')
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Authentication required'}), 401
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def get_metrics():
+    return current_app.extensions.get('metrics')
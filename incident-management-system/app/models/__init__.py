@@ -1,38 +1,8 @@
-# app/__init__.py
-from flask import Flask
-from app.config import Config
-from app.database import init_db
-from app.email_service import init_mail
-from flask_login import LoginManager
-
-login_manager = LoginManager()
-
-def create_app(config_class=Config):
-    app = Flask(__name__)
-    app.config.from_object(config_class)
-    
-    # Initialize extensions
-    init_db(app)
-    init_mail(app)
-    login_manager.init_app(app)
-    login_manager.login_view = 'auth.login'
-    
-    # Register blueprints
-    from app.routes.auth import auth_bp
-    from app.routes.incidents import incidents_bp
-    from app.routes.api import api_bp
-    from app.routes.main import main_bp
-    
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(incidents_bp)
-    app.register_blueprint(api_bp, url_prefix='/api')
-    app.register_blueprint(main_bp)
-    
-    # Setup login manager
-    from app.models.user import User
-    
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
-    
-    return app
\ No newline at end of file
+# app/models/__init__.py
+from app.models.user import User
+from app.models.incident import Incident
+from app.models.comment import Comment
+from app.models.tombstone import IncidentTombstone
+from app.models.incident_event import IncidentEvent
+from app.models.archive import ArchivedIncident, ArchivedComment
+from app.models.api_token import ApiToken
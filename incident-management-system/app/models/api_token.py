@@ -0,0 +1,31 @@
+# app/models/api_token.py
+from app.database import db
+from datetime import datetime
+
+class ApiToken(db.Model):
+    # Bearer token for machine clients of the JSON API. Only the sha256 of
+    # the token is stored; the token itself is shown once, when issued.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(64), nullable=False)
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    prefix = db.Column(db.String(12), nullable=False)  # first characters, to tell tokens apart
+    scopes = db.Column(db.String(64), nullable=False, default='read')  # space separated: 'read', 'write'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime)
+    revoked_at = db.Column(db.DateTime)
+    user = db.relationship('User', backref=db.backref('api_tokens', lazy='dynamic'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'prefix': self.prefix,
+            'scopes': self.scopes.split(),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None
+        }
+
+    def __repr__(self):
+        return f'<ApiToken {self.prefix}>'
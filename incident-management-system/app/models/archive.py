@@ -0,0 +1,66 @@
+# app/models/archive.py
+from app.database import db
+from datetime import datetime
+
+# Long-closed incidents and their comments are moved here by app/archive.py
+# so the hot incident and comment tables only hold live history. Columns
+# mirror Incident and Comment, keeping the original ids.
+
+class ArchivedIncident(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    priority = db.Column(db.String(20))
+    status = db.Column(db.String(20))
+    incident_type = db.Column(db.String(50), nullable=False)
+    creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    assignee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+    fingerprint = db.Column(db.String(64), nullable=True)
+    occurrence_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    creator = db.relationship('User', foreign_keys=[creator_id])
+    assignee = db.relationship('User', foreign_keys=[assignee_id])
+
+    def __repr__(self):
+        return f'<ArchivedIncident {self.title}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'priority': self.priority,
+            'status': self.status,
+            'incident_type': self.incident_type,
+            'creator_id': self.creator_id,
+            'assignee_id': self.assignee_id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'fingerprint': self.fingerprint,
+            'occurrence_count': self.occurrence_count,
+            'comment_count': self.comment_count,
+            'last_activity_at': self.last_activity_at.isoformat() if self.last_activity_at else None,
+            'archived_at': self.archived_at.isoformat()
+        }
+
+class ArchivedComment(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content = db.Column(db.Text, nullable=False)
+    incident_id = db.Column(db.Integer, nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    author = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_archived_comment_incident_created_at', 'incident_id', 'created_at', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<ArchivedComment {self.id}>'
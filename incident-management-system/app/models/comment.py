@@ -10,5 +10,10 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Comment timelines are always read per incident, a keyset page at a time
+    __table_args__ = (
+        db.Index('ix_comment_incident_created_at', 'incident_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<Comment {self.id}>'
\ No newline at end of file
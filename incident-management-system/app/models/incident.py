@@ -14,8 +14,26 @@ class Incident(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime, nullable=True)
+    fingerprint = db.Column(db.String(64), nullable=True)  # sha256 of the dedup fields, see app/ingest.py
+    occurrence_count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Kept in step by app.queries.create_comment so listing pages never read the comment table
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)  # creation or newest comment
     comments = db.relationship('Comment', backref='incident', lazy='dynamic', cascade='all, delete-orphan')
 
+    # Composite indexes matching the filter/sort shapes of the list, API and dashboard queries
+    __table_args__ = (
+        db.Index('ix_incident_created_at_id', 'created_at', 'id'),
+        db.Index('ix_incident_updated_at_id', 'updated_at', 'id'),
+        db.Index('ix_incident_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_incident_priority_created_at', 'priority', 'created_at', 'id'),
+        db.Index('ix_incident_type_created_at', 'incident_type', 'created_at', 'id'),
+        db.Index('ix_incident_assignee_created_at', 'assignee_id', 'created_at'),
+        db.Index('ix_incident_creator_created_at', 'creator_id', 'created_at'),
+        db.Index('ix_incident_status_priority_type', 'status', 'priority', 'incident_type'),
+        db.Index('ix_incident_fingerprint_status', 'fingerprint', 'status'),
+    )
+
     def __repr__(self):
         return f'<Incident {self.title}>'
 
@@ -31,5 +49,9 @@ class Incident(db.Model):
             'assignee_id': self.assignee_id,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None
+            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None,
+            'fingerprint': self.fingerprint,
+            'occurrence_count': self.occurrence_count,
+            'comment_count': self.comment_count,
+            'last_activity_at': self.last_activity_at.isoformat() if self.last_activity_at else None
         }
\ No newline at end of file
@@ -0,0 +1,40 @@
+# app/models/incident_event.py
+from app.database import db
+from datetime import datetime
+
+class IncidentEvent(db.Model):
+    # Append-only history of incident changes, written in the same transaction
+    # as the change itself. Each row carries the incident's priority, type and
+    # assignee after the change so analytics never have to join back to
+    # incidents that may since have been edited, archived or deleted.
+    id = db.Column(db.Integer, primary_key=True)
+    incident_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)  # 'created', 'status', 'assignee', 'priority', 'incident_type', 'deleted'
+    from_value = db.Column(db.String(50), nullable=True)
+    to_value = db.Column(db.String(50), nullable=True)
+    actor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    priority = db.Column(db.String(20), nullable=True)
+    incident_type = db.Column(db.String(50), nullable=True)
+    assignee_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_incident_event_incident_id', 'incident_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<IncidentEvent {self.event_type} {self.incident_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'incident_id': self.incident_id,
+            'event_type': self.event_type,
+            'from_value': self.from_value,
+            'to_value': self.to_value,
+            'actor_id': self.actor_id,
+            'priority': self.priority,
+            'incident_type': self.incident_type,
+            'assignee_id': self.assignee_id,
+            'created_at': self.created_at.isoformat()
+        }
@@ -0,0 +1,11 @@
+# app/models/tombstone.py
+from app.database import db
+from datetime import datetime
+
+class IncidentTombstone(db.Model):
+    # Remembers deleted incidents so incremental sync clients can drop them
+    incident_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<IncidentTombstone {self.incident_id}>'
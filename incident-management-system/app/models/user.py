@@ -10,6 +10,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
     role = db.Column(db.String(20), default='user')  # 'user', 'admin', 'manager'
+    notification_mode = db.Column(db.String(20), default='immediate')  # 'immediate', 'digest'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     incidents_created = db.relationship('Incident', foreign_keys='Incident.creator_id', backref='creator', lazy='dynamic')
     incidents_assigned = db.relationship('Incident', foreign_keys='Incident.assignee_id', backref='assignee', lazy='dynamic')
@@ -0,0 +1,210 @@
+# app/principals.py
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+from app.database import db, RoutingSession
+from app.models.user import User
+from app.models.api_token import ApiToken
+from app.recipients import invalidate_recipients
+
+TOKEN_PREFIX = 'ims_'
+TOKEN_SCOPES = ('read', 'write')
+DEFAULT_PRINCIPAL_TTL = 30
+
+_lock = threading.Lock()
+_principals = {}
+_generation = 0
+
+class Principal(UserMixin):
+    # What current_user is for every request: a plain snapshot of the user's
+    # columns, not bound to any session, so one cached copy can serve many
+    # requests and threads. Load the User itself to change anything.
+    # scopes is None for browser sessions, which may do anything the role
+    # allows, and the token's scopes for API tokens.
+
+    def __init__(self, id, username, email, role, notification_mode, scopes=None, token_id=None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.notification_mode = notification_mode
+        self.scopes = scopes
+        self.token_id = token_id
+
+    def can(self, scope):
+        return self.scopes is None or scope in self.scopes
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+PRINCIPAL_COLUMNS = (User.id, User.username, User.email, User.role, User.notification_mode)
+
+def user_statement(user_id):
+    return select(*PRINCIPAL_COLUMNS).where(User.id == user_id)
+
+def token_statement(token_hash):
+    # token_hash is unique and indexed, so this is a single index probe
+    return select(*PRINCIPAL_COLUMNS, ApiToken.id, ApiToken.scopes, ApiToken.expires_at) \
+        .join(ApiToken, ApiToken.user_id == User.id) \
+        .where(ApiToken.token_hash == token_hash, ApiToken.revoked_at.is_(None))
+
+def user_principal(row):
+    return Principal(*row) if row else None
+
+def token_principal(row):
+    # Returns (principal, expires_at), or (None, None) for an expired token
+    if not row:
+        return None, None
+    *columns, token_id, scopes, expires_at = row
+    if expires_at and expires_at <= datetime.utcnow():
+        return None, None
+    return Principal(*columns, scopes=frozenset(scopes.split()), token_id=token_id), expires_at
+
+def hash_token(token):
+    # Tokens carry 256 random bits, so a plain sha256 is enough; comparing
+    # digests through the index leaks nothing useful about the token itself
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def bearer_token(header):
+    scheme, _, token = (header or '').partition(' ')
+    token = token.strip()
+    if scheme.lower() != 'bearer' or not token.startswith(TOKEN_PREFIX):
+        return None
+    return token
+
+def principal_generation():
+    return _generation
+
+def cached_principal(key):
+    entry = _principals.get(key)
+    if entry and time.monotonic() < entry[0]:
+        return entry[1]
+    return None
+
+def remember_principal(key, principal, generation, config, expires_at=None):
+    # Skipped when the cache was invalidated while the principal was loaded;
+    # a token's entry never outlives the token
+    if principal is None:
+        return None
+    ttl = config.get('PRINCIPAL_CACHE_TTL', DEFAULT_PRINCIPAL_TTL)
+    if expires_at:
+        ttl = min(ttl, (expires_at - datetime.utcnow()).total_seconds())
+    with _lock:
+        if generation == _generation and ttl > 0:
+            _principals[key] = (time.monotonic() + ttl, principal)
+    return principal
+
+def load_principal(user_id):
+    key = ('user', user_id)
+    principal = cached_principal(key)
+    if principal:
+        return principal
+
+    generation = _generation
+    row = db.session.execute(user_statement(user_id)).first()
+    return remember_principal(key, user_principal(row), generation, current_app.config)
+
+def principal_for_token(token):
+    key = ('token', hash_token(token))
+    principal = cached_principal(key)
+    if principal:
+        return principal
+
+    generation = _generation
+    row = db.session.execute(token_statement(key[1])).first()
+    principal, expires_at = token_principal(row)
+    return remember_principal(key, principal, generation, current_app.config, expires_at)
+
+def principal_from_request(request):
+    # Bearer tokens are only accepted by the JSON API
+    if request.blueprint != 'api':
+        return None
+    token = bearer_token(request.headers.get('Authorization'))
+    return principal_for_token(token) if token else None
+
+def invalidate_principals():
+    global _generation
+
+    with _lock:
+        _generation += 1
+        _principals.clear()
+
+def parse_scopes(scopes):
+    # Accepts a list or a comma or space separated string
+    if isinstance(scopes, str):
+        scopes = scopes.replace(',', ' ').split()
+    if not isinstance(scopes, list) or not scopes:
+        raise ValueError(f'scopes must list one or more of {", ".join(TOKEN_SCOPES)}')
+    unknown = [scope for scope in scopes if scope not in TOKEN_SCOPES]
+    if unknown:
+        raise ValueError(f'Unknown scopes: {", ".join(map(str, unknown))}')
+    return [scope for scope in TOKEN_SCOPES if scope in scopes]
+
+def issue_token(user_id, name, scopes, expires_at=None):
+    # Returns (token, ApiToken); the caller commits. The token is never
+    # stored, so it can only be shown now.
+    token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    api_token = ApiToken(user_id=user_id, name=name, token_hash=hash_token(token), prefix=token[:12],
+                         scopes=' '.join(scopes), expires_at=expires_at)
+    db.session.add(api_token)
+    return token, api_token
+
+# Any committed change to a user or a token, a role or password change or a
+# revocation included, drops the cached principals; any committed change to
+# a user, sign-ups included, drops the recipient directory as well. Other
+# processes catch up within PRINCIPAL_CACHE_TTL and RECIPIENT_CACHE_TTL.
+def _mark_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['principals_changed'] = True
+        if isinstance(target, User):
+            session.info['recipients_changed'] = True
+
+def _mark_user_added(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['recipients_changed'] = True
+
+for _model in (User, ApiToken):
+    event.listen(_model, 'after_update', _mark_changed)
+    event.listen(_model, 'after_delete', _mark_changed)
+event.listen(User, 'after_insert', _mark_user_added)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('principals_changed', False):
+        invalidate_principals()
+    if session.info.pop('recipients_changed', False):
+        invalidate_recipients()
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_changes(session):
+    session.info.pop('principals_changed', None)
+    session.info.pop('recipients_changed', None)
+
+def init_principals(app):
+    @app.cli.command('create-api-token')
+    @click.argument('username')
+    @click.option('--name', default='cli', help='Label shown when listing tokens.')
+    @click.option('--scopes', default='read', help='Comma separated: read, write.')
+    @click.option('--expires-days', type=int, default=None, help='Days until the token expires; never by default.')
+    def create_api_token(username, name, scopes, expires_days):
+        """Issue an API token for a user and print it."""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f'No user named {username}')
+        try:
+            scopes = parse_scopes(scopes)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        expires_at = datetime.utcnow() + timedelta(days=expires_days) if expires_days else None
+        token, _ = issue_token(user.id, name, scopes, expires_at)
+        db.session.commit()
+        click.echo(token)
@@ -0,0 +1,24 @@
+# app/proxy.py
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+def forwarded_addr(remote_addr, forwarded_for, hops):
+    # The client address as ProxyFix finds it: each of the hops proxies in
+    # front of the app appends the address it was reached from, so the
+    # hops-th entry from the right is the last one a trusted proxy wrote.
+    # Entries left of it come from the client and can say anything.
+    if not hops or not forwarded_for:
+        return remote_addr
+    addrs = forwarded_for.split(',')
+    if len(addrs) < hops:
+        return remote_addr
+    return addrs[-hops].strip()
+
+def init_proxy(app):
+    # Behind PROXY_FIX_HOPS reverse proxies, take the client address, scheme
+    # and host from their X-Forwarded-* headers, so rate limits count
+    # clients rather than the proxy and url_for builds public URLs. Leave it
+    # at 0 when clients connect directly, or they could pick their own
+    # address.
+    hops = app.config.get('PROXY_FIX_HOPS', 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
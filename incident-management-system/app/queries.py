@@ -0,0 +1,177 @@
+# app/queries.py
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import event, select, tuple_
+from sqlalchemy.orm import configure_mappers, joinedload
+from app.database import db
+from app.models.incident import Incident
+from app.models.user import User
+from app.models.comment import Comment
+
+# Backref attributes such as Incident.creator and Comment.author only exist
+# once the mappers have been configured
+configure_mappers()
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+COMMENT_PAGE_SIZE = 20
+STREAM_CHUNK_SIZE = 1000
+
+# Columns that may be requested through the ``fields`` projection
+INCIDENT_FIELDS = ('id', 'title', 'description', 'priority', 'status', 'incident_type',
+                   'creator_id', 'assignee_id', 'created_at', 'updated_at', 'resolved_at',
+                   'fingerprint', 'occurrence_count', 'comment_count', 'last_activity_at')
+
+COMMENT_FIELDS = ('id', 'content', 'author_id', 'author_name', 'created_at')
+
+# Keyset columns are always selected so a cursor can be built from any row
+KEYSET_FIELDS = ('created_at', 'id')
+
+def filter_incidents(query, status='', priority='', incident_type=''):
+    if status:
+        query = query.filter(Incident.status == status)
+    if priority:
+        query = query.filter(Incident.priority == priority)
+    if incident_type:
+        query = query.filter(Incident.incident_type == incident_type)
+    return query
+
+def with_people(query):
+    # Load creator and assignee in the same SELECT instead of one query per row
+    return query.options(joinedload(Incident.creator), joinedload(Incident.assignee))
+
+def incident_with_people(incident_id):
+    return with_people(Incident.query).filter(Incident.id == incident_id).first_or_404()
+
+def comment_timeline(incident):
+    # Unordered; comment_page applies the keyset order
+    return incident.comments.options(joinedload(Comment.author))
+
+def comment_page(query, model, limit, cursor=None):
+    # Newest comments first, so a busy incident costs one page like a quiet
+    # one; a page's next_cursor fetches the comments before it
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, comment_id))
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    return trim_page(rows, limit)
+
+def create_comment(incident, content, author_id):
+    # Keeps the incident's comment counters in step in the same transaction;
+    # the increment runs in SQL so concurrent comments are all counted
+    comment = Comment(content=content, incident_id=incident.id, author_id=author_id,
+                      created_at=datetime.utcnow())
+    db.session.add(comment)
+    incident.comment_count = Incident.comment_count + 1
+    incident.last_activity_at = comment.created_at
+    return comment
+
+def parse_fields(raw):
+    if not raw:
+        return INCIDENT_FIELDS
+
+    fields = tuple(dict.fromkeys(field.strip() for field in raw.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in INCIDENT_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown field(s): {", ".join(unknown)}')
+    return fields or INCIDENT_FIELDS
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE):
+    try:
+        limit = int(raw) if raw else default
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(created_at, incident_id):
+    payload = json.dumps([created_at.isoformat(), incident_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, incident_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(incident_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def keyset_order(query):
+    return query.order_by(Incident.created_at.desc(), Incident.id.desc())
+
+def after_cursor(query, cursor):
+    if not cursor:
+        return query
+    created_at, incident_id = decode_cursor(cursor)
+    return query.filter(tuple_(Incident.created_at, Incident.id) < tuple_(created_at, incident_id))
+
+def projected_columns(fields):
+    # The requested fields first, in order; row_to_dict relies on it
+    columns = tuple(dict.fromkeys(fields + KEYSET_FIELDS))
+    return [getattr(Incident, column) for column in columns]
+
+def project(query, fields):
+    # Load only the requested columns as plain rows instead of full ORM instances
+    return query.with_entities(*projected_columns(fields))
+
+def keyset_page(query, limit, cursor=None):
+    # Fetch one extra row to know whether another page exists
+    rows = keyset_order(after_cursor(query, cursor)).limit(limit + 1).all()
+    return trim_page(rows, limit)
+
+def trim_page(rows, limit):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+def row_to_dict(row, fields):
+    # Values are left as loaded, datetimes included, for app.serialization
+    # to encode. The requested fields lead every projected row (see
+    # projected_columns), so zipping stops before any keyset extras.
+    return dict(zip(fields, row))
+
+def incident_statement(model, incident_id):
+    # One incident, Incident or ArchivedIncident, as a plain row with the
+    # keys of its to_dict
+    columns = [getattr(model, field) for field in INCIDENT_FIELDS]
+    if hasattr(model, 'archived_at'):
+        columns.append(model.archived_at)
+    return select(*columns).where(model.id == incident_id)
+
+def comment_rows(model, incident_id):
+    # Comment or ArchivedComment as plain rows of COMMENT_FIELDS, for the
+    # API; unordered, like comment_timeline
+    return db.session.query(model.id, model.content, model.author_id, User.username.label('author_name'),
+                            model.created_at).join(User, User.id == model.author_id) \
+        .filter(model.incident_id == incident_id)
+
+# Counts the SQL statements sent while the block runs, e.g. to assert that a
+# listing page issues the same number of queries however many rows it shows:
+#
+#     with QueryCounter() as counter:
+#         client.get('/incidents')
+#     assert counter.count == 2
+class QueryCounter:
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
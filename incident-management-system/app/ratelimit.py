@@ -0,0 +1,202 @@
+# app/ratelimit.py
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import jsonify, request
+from flask_login import current_user
+from app.replicas import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+BUDGETS = ('cheap', 'expensive', 'write')
+DEFAULT_BUDGETS = {'cheap': '20,60', 'expensive': '2,10', 'write': '5,30'}
+DEFAULT_MAX_BUCKETS = 100000
+# Under load, expensive reads are shed once requests queue for longer than
+# SHED_QUEUE_MS, cheap reads at twice that, and writes never
+SHED_FACTORS = {'expensive': 1, 'cheap': 2}
+
+def rate_budget(budget):
+    # Marks a view as spending from a budget other than its method's default
+    def decorator(f):
+        f.rate_budget = budget
+        return f
+    return decorator
+
+def request_budget(view, method):
+    budget = getattr(view, 'rate_budget', None)
+    if budget:
+        return budget
+    return 'cheap' if method in SAFE_METHODS else 'write'
+
+def client_key(principal, remote_addr):
+    # Each API token has its own buckets, a signed-in user shares theirs
+    # across sessions, and anyone else is counted by address
+    if principal is not None and principal.is_authenticated:
+        if principal.token_id is not None:
+            return f'token:{principal.token_id}'
+        return f'user:{principal.id}'
+    return f'ip:{remote_addr}'
+
+def parse_budget(value):
+    # "<requests per second>,<burst>"
+    rate, burst = (float(part) for part in value.split(','))
+    if rate <= 0 or burst < 1:
+        raise ValueError(f'Invalid rate limit {value!r}')
+    return rate, burst
+
+def queue_seconds(header, now=None):
+    # Time the request waited before a worker picked it up, from the
+    # X-Request-Start header a proxy stamps it with, e.g. nginx's
+    # proxy_set_header X-Request-Start "t=${msec}"; None when absent
+    if not header:
+        return None
+    try:
+        started = float(header.strip().removeprefix('t='))
+    except ValueError:
+        return None
+    # Seconds, milliseconds or microseconds since the epoch
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max(0.0, (now or time.time()) - started)
+
+class MemoryBuckets:
+    # Token buckets for this process only; with several workers each gets
+    # its own, so the effective limit is the budget times the worker count
+
+    def __init__(self, refill_seconds, max_buckets=DEFAULT_MAX_BUCKETS):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> (tokens, updated), least recently used first
+        self.refill_seconds = refill_seconds  # longest time any bucket takes to fill up
+        self.max_buckets = max_buckets
+
+    def take(self, key, rate, burst):
+        # Returns 0 when a token was taken, else the seconds until one is due
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        # A bucket idle for long enough to refill carries no state, and the
+        # idlest sit at the front. Past max_buckets the least recently used
+        # go as well, so a flood of new keys forgets only the quietest
+        # clients rather than every client at once.
+        while self._buckets:
+            tokens, updated = next(iter(self._buckets.values()))
+            if now - updated <= self.refill_seconds and len(self._buckets) <= self.max_buckets:
+                return
+            self._buckets.popitem(last=False)
+
+# Atomic refill-and-take on a Redis hash, on Redis' own clock so every
+# worker and host agrees on the time
+TOKEN_BUCKET_SCRIPT = '''
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+'''
+
+class RedisBuckets:
+    # Token buckets shared by every worker and host through Redis. Needs the
+    # redis package; if Redis is unreachable requests are let through.
+
+    def __init__(self, url, prefix='ims:ratelimit:'):
+        # Imported here so redis is only needed when configured
+        import redis
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefix = prefix
+
+    def take(self, key, rate, burst):
+        try:
+            return float(self._script(keys=[self.prefix + key], args=[rate, burst]))
+        except self._errors:
+            logger.warning('Rate limit storage unavailable, letting request through', exc_info=True)
+            return 0.0
+
+class RateLimiter:
+
+    def __init__(self, budgets, backend, shed_after=None):
+        self.budgets = budgets  # name -> (rate, burst)
+        self.backend = backend
+        self.shed_after = shed_after  # seconds of queueing, or None
+
+    def check(self, budget, key, queued=None):
+        # Returns None to let the request through, or (status, retry_after)
+        factor = SHED_FACTORS.get(budget)
+        if self.shed_after and factor and queued is not None and queued > self.shed_after * factor:
+            return 503, 1
+
+        rate, burst = self.budgets[budget]
+        wait = self.backend.take(f'{budget}:{key}', rate, burst)
+        if wait > 0:
+            return 429, math.ceil(wait)
+        return None
+
+def rejection(metrics, budget, status, retry_after):
+    # Counts a refused request and returns the JSON body to answer it with
+    if metrics:
+        metrics.inc('api_requests_rejected_total', budget=budget, reason='rate_limit' if status == 429 else 'shed')
+    return {'error': 'Rate limit exceeded' if status == 429 else 'Server busy, retry shortly',
+            'retry_after': retry_after}
+
+def init_ratelimit(app):
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return
+
+    budgets = {budget: parse_budget(app.config.get(f'RATE_LIMIT_{budget.upper()}') or DEFAULT_BUDGETS[budget])
+               for budget in BUDGETS}
+    url = app.config.get('RATE_LIMIT_STORAGE_URL')
+    backend = RedisBuckets(url) if url else MemoryBuckets(max(burst / rate for rate, burst in budgets.values()))
+    shed_ms = app.config.get('SHED_QUEUE_MS', 0)
+    limiter = RateLimiter(budgets, backend, shed_ms / 1000 if shed_ms else None)
+    app.extensions['rate_limiter'] = limiter
+
+    metrics = app.extensions.get('metrics')
+    if metrics:
+        metrics.counter('api_requests_rejected_total', 'API requests refused, by budget and reason.')
+
+    @app.before_request
+    def limit_api_requests():
+        if request.blueprint != 'api':
+            return None
+
+        budget = request_budget(app.view_functions.get(request.endpoint), request.method)
+        queued = queue_seconds(request.headers.get('X-Request-Start'))
+        result = limiter.check(budget, client_key(current_user, request.remote_addr), queued)
+        if result is None:
+            return None
+
+        status, retry_after = result
+        response = jsonify(rejection(metrics, budget, status, retry_after))
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
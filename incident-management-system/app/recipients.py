@@ -0,0 +1,99 @@
+# app/recipients.py
+import threading
+import time
+from flask import current_app
+from app.database import db
+from app.models.user import User
+
+STAFF_ROLES = ('admin', 'manager')
+DEFAULT_RECIPIENT_TTL = 300
+MAX_CACHED_EMAILS = 10000
+
+_lock = threading.Lock()
+_roles = None
+_emails = {}
+_emails_expire_at = 0.0
+_expires_at = 0.0
+_digests = None
+_digests_expire_at = 0.0
+_generation = 0
+
+def _role_directory():
+    global _roles, _expires_at
+
+    now = time.monotonic()
+    roles = _roles
+    if roles is not None and now < _expires_at:
+        return roles
+
+    with _lock:
+        if _roles is not None and now < _expires_at:
+            return _roles
+        generation = _generation
+
+        # Only the email column is needed, for every staff role in one query
+        roles = {role: [] for role in STAFF_ROLES}
+        rows = db.session.query(User.role, User.email).filter(User.role.in_(STAFF_ROLES)).order_by(User.id)
+        for role, email in rows:
+            roles[role].append(email)
+
+        if generation == _generation:
+            _roles = roles
+            _expires_at = now + current_app.config.get('RECIPIENT_CACHE_TTL', DEFAULT_RECIPIENT_TTL)
+        return roles
+
+def staff_emails(roles=STAFF_ROLES):
+    directory = _role_directory()
+    return [email for role in roles for email in directory.get(role, ())]
+
+def emails_for_users(user_ids):
+    global _emails_expire_at
+
+    user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+    now = time.monotonic()
+    cached = _emails if now < _emails_expire_at else {}
+    emails = {user_id: email for user_id in user_ids if (email := cached.get(user_id)) is not None}
+    missing = [user_id for user_id in user_ids if user_id not in emails]
+
+    if missing:
+        generation = _generation
+        rows = dict(db.session.query(User.id, User.email).filter(User.id.in_(missing)).all())
+        emails.update(rows)
+        with _lock:
+            if generation == _generation:
+                # The whole map expires at once, and starts over rather than
+                # grow past MAX_CACHED_EMAILS
+                if now >= _emails_expire_at or len(_emails) + len(rows) > MAX_CACHED_EMAILS:
+                    _emails.clear()
+                    _emails_expire_at = now + current_app.config.get('RECIPIENT_CACHE_TTL', DEFAULT_RECIPIENT_TTL)
+                _emails.update(rows)
+
+    return [emails[user_id] for user_id in user_ids if user_id in emails]
+
+def digest_emails():
+    # Emails of everyone who chose digest delivery; few people do, so the
+    # whole set is cached like the role directory
+    global _digests, _digests_expire_at
+
+    now = time.monotonic()
+    digests = _digests
+    if digests is not None and now < _digests_expire_at:
+        return digests
+
+    generation = _generation
+    digests = frozenset(email for email, in db.session.query(User.email).filter(User.notification_mode == 'digest'))
+    if generation == _generation:
+        _digests = digests
+        _digests_expire_at = now + current_app.config.get('RECIPIENT_CACHE_TTL', DEFAULT_RECIPIENT_TTL)
+    return digests
+
+def invalidate_recipients():
+    # Called after any committed change to a user; see app/principals.py
+    global _roles, _digests, _emails_expire_at, _generation
+
+    with _lock:
+        _generation += 1
+        _roles = None
+        _digests = None
+        _emails.clear()
+        _emails_expire_at = 0.0
@@ -0,0 +1,36 @@
+# app/replicas.py
+import random
+import time
+from functools import wraps
+from flask import current_app, g, request, session
+
+DEFAULT_STICKY_SECONDS = 5
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def choose_replica():
+    # None means the primary: no replicas are configured, or this user wrote
+    # recently and must be able to read their own write
+    return pick_replica(current_app.extensions.get('db_replicas'), session.get('db_primary_until', 0))
+
+def pick_replica(replicas, primary_until):
+    if not replicas or primary_until > time.time():
+        return None
+    return random.choice(replicas)
+
+def read_only(f):
+    # Lets a route's queries go to a read replica; see RoutingSession
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_replica = choose_replica()
+        return f(*args, **kwargs)
+    return decorated_function
+
+def init_replicas(app):
+    @app.after_request
+    def stick_to_primary(response):
+        # Any unsafe request may have written, so keep this user on the
+        # primary until replicas have had time to catch up
+        if app.extensions.get('db_replicas') and request.method not in SAFE_METHODS:
+            sticky = app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+            session['db_primary_until'] = time.time() + sticky
+        return response
@@ -1,56 +1,178 @@
 # app/routes/api.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from app.models.incident import Incident
 from app.models.user import User
 from app.models.comment import Comment
+from app.models.incident_event import IncidentEvent
+from app.models.archive import ArchivedIncident, ArchivedComment
 from app.database import db
-from datetime import datetime
-from app.email_service import send_incident_notification, send_assignment_notification, send_status_update_notification
+from app.queries import (STREAM_CHUNK_SIZE, filter_incidents, parse_fields, parse_limit,
+                         project, after_cursor, keyset_order, keyset_page, row_to_dict, incident_statement,
+                         comment_rows, COMMENT_FIELDS, COMMENT_PAGE_SIZE, comment_page, create_comment)
+from app.search import search_incidents
+from app.stats import invalidate_stats
+from app.events import get_event_bus, publish_incident_event, publish_comment_event, event_stream, \
+    DEFAULT_KEEPALIVE
+from app.replicas import SAFE_METHODS, read_only
+from app.archive import find_archived_incident
+from app.export import EXPORT_FORMATS, EXPORT_DATASETS, export_rows
+from app.analytics import DIMENSIONS, get_analytics, record_event, record_changes
+from app.sync import make_etag, not_modified, with_etag, collection_version, \
+    parse_updated_since, tombstone_horizon, changed_page, deleted_since, record_tombstones, sync_token, \
+    latest_change_statement
+from app.recipients import staff_emails, emails_for_users
+from app.serialization import dumps
+from app.principals import parse_scopes, issue_token
+from app.ratelimit import rate_budget
+from app.models.api_token import ApiToken
+from datetime import datetime, timedelta
+from app.email_service import send_incident_notification, send_assignment_notification, send_status_update_notification, \
+    send_bulk_incident_notification
+from app.ingest import DEFAULT_BULK_LIMIT, iter_payload, validate_incident, bulk_ingest_incidents, \
+    fingerprint_for, record_occurrence
 from functools import wraps
 
 api_bp = Blueprint('api', __name__)
 
+SEARCH_PAGE_SIZE = 20
+
 # Custom decorator for API authentication
 def api_login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated:
             return jsonify({'error': 'Authentication required'}), 401
+        # API tokens only reach the routes their scopes allow
+        scope = 'read' if request.method in SAFE_METHODS else 'write'
+        if not current_user.can(scope):
+            return jsonify({'error': f'Token lacks the {scope} scope'}), 403
         return f(*args, **kwargs)
     return decorated_function
 
 # API route to get all incidents
 @api_bp.route('/incidents', methods=['GET'])
+@rate_budget('expensive')
 @api_login_required
+@read_only
 def get_incidents():
     # Filter incidents based on query parameters
     status = request.args.get('status', '')
     priority = request.args.get('priority', '')
     type = request.args.get('type', '')
+    cursor = request.args.get('cursor', '')
+    updated_since = request.args.get('updated_since', '')
+    stream = request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+    
+    try:
+        fields = parse_fields(request.args.get('fields', ''))
+        limit = parse_limit(request.args.get('limit', ''))
+        query = filter_incidents(Incident.query, status, priority, type)
+        if updated_since:
+            since, since_id = parse_updated_since(updated_since)
+            query = project(query, fields + ('updated_at',))
+        else:
+            query = after_cursor(project(query, fields), cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if updated_since:
+        # Deletions older than the tombstone retention are forgotten, so such
+        # a client has to start over with a full listing
+        if since < tombstone_horizon():
+            return jsonify({'error': 'updated_since is older than the tombstone retention; do a full sync'}), 410
+        
+        etag = make_etag('changes', request.full_path, collection_version())
+        response = not_modified(etag)
+        if response:
+            return response
+        
+        rows, token, has_more = changed_page(query, limit, since, since_id)
+        
+        return with_etag(jsonify({
+            'incidents': [row_to_dict(row, fields) for row in rows],
+            'deleted': deleted_since(since),
+            'sync_token': token,
+            'has_more': has_more
+        }), etag)
+    
+    if stream:
+        # Stream every matching row as NDJSON straight off a server-side cursor
+        query = keyset_order(query)
+        if 'limit' in request.args:
+            query = query.limit(limit)
+        
+        def generate():
+            for row in query.yield_per(STREAM_CHUNK_SIZE):
+                yield dumps(row_to_dict(row, fields)) + b'\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    version = collection_version()
+    etag = make_etag('incidents', request.full_path, version)
+    response = not_modified(etag)
+    if response:
+        return response
+    
+    rows, next_cursor = keyset_page(query, limit)
+    data = {
+        'incidents': [row_to_dict(row, fields) for row in rows],
+        'next_cursor': next_cursor
+    }
+    
+    # A full listing starts an incremental sync: pass this token back as
+    # updated_since to get only what changed after the first page was read
+    if not cursor:
+        data['sync_token'] = sync_token(*(db.session.execute(latest_change_statement()).first() or (None, 0)),
+                                        current_app.config)
+    
+    return with_etag(jsonify(data), etag)
+
+# API route to search incidents and their comments
+@api_bp.route('/incidents/search', methods=['GET'])
+@rate_budget('expensive')
+@api_login_required
+@read_only
+def search():
+    q = request.args.get('q', '').strip()
     
-    query = Incident.query
+    if not q:
+        return jsonify({'error': 'No search query provided'}), 400
     
-    if status:
-        query = query.filter_by(status=status)
-    if priority:
-        query = query.filter_by(priority=priority)
-    if type:
-        query = query.filter_by(incident_type=type)
+    page = max(request.args.get('page', 1, type=int), 1)
+    try:
+        per_page = parse_limit(request.args.get('limit', ''), default=SEARCH_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    incidents = query.order_by(Incident.created_at.desc()).all()
+    incidents, ranks, has_next = search_incidents(q, page, per_page)
     
     return jsonify({
-        'incidents': [incident.to_dict() for incident in incidents]
+        'incidents': [dict(incident.to_dict(), rank=ranks[incident.id]) for incident in incidents],
+        'page': page,
+        'next_page': page + 1 if has_next else None
     })
 
 # API route to get a specific incident
 @api_bp.route('/incidents/<int:incident_id>', methods=['GET'])
 @api_login_required
+@read_only
 def get_incident(incident_id):
-    incident = Incident.query.get_or_404(incident_id)
+    # Long-closed incidents are served read-only from the archive; either
+    # way one plain row, no ORM instance
+    row = db.session.execute(incident_statement(Incident, incident_id)).first() or \
+        db.session.execute(incident_statement(ArchivedIncident, incident_id)).first()
     
-    return jsonify(incident.to_dict())
+    if not row:
+        return jsonify({'error': 'Incident not found'}), 404
+    
+    etag = make_etag('incident', row.id, row.updated_at)
+    response = not_modified(etag)
+    if response:
+        return response
+    
+    return with_etag(jsonify(row._asdict()), etag)
 
 # API route to create an incident
 @api_bp.route('/incidents', methods=['POST'])
@@ -66,22 +188,37 @@ def create_incident():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
+    # Repeats of an active incident only bump its occurrence counter
+    fingerprint = fingerprint_for(data)
+    if fingerprint:
+        duplicate = record_occurrence(fingerprint)
+        if duplicate is not None:
+            incident_data = duplicate.to_dict()
+            db.session.commit()
+            return jsonify({
+                'message': 'Duplicate of an active incident, occurrence recorded',
+                'incident': incident_data
+            }), 200
+    
     incident = Incident(
         title=data['title'],
         description=data['description'],
         priority=data.get('priority', 'medium'),
         incident_type=data['incident_type'],
         creator_id=current_user.id,
-        status='open'
+        status='open',
+        fingerprint=fingerprint
     )
     
     db.session.add(incident)
+    db.session.flush()
+    record_event(incident, 'created', to_value=incident.status, actor_id=current_user.id)
     db.session.commit()
+    invalidate_stats()
+    publish_incident_event('incident_created', incident)
     
     # Send email notification to admins and managers
-    admin_emails = [user.email for user in User.query.filter_by(role='admin').all()]
-    manager_emails = [user.email for user in User.query.filter_by(role='manager').all()]
-    recipients = admin_emails + manager_emails
+    recipients = staff_emails()
     
     if recipients:
         send_incident_notification(incident, recipients)
@@ -91,6 +228,49 @@ def create_incident():
         'incident': incident.to_dict()
     }), 201
 
+# API route to create many incidents in one request
+@api_bp.route('/incidents/bulk', methods=['POST'])
+@rate_budget('expensive')
+@api_login_required
+def bulk_create_incidents():
+    limit = current_app.config.get('BULK_INGEST_LIMIT', DEFAULT_BULK_LIMIT)
+    valid = []
+    errors = []
+    
+    # Validate everything in one pass before touching the database
+    try:
+        for index, item, error in iter_payload(request):
+            if index >= limit:
+                return jsonify({'error': f'At most {limit} incidents per request'}), 413
+            error = error or validate_incident(item)
+            if error:
+                errors.append({'index': index, 'error': error})
+            else:
+                valid.append((index, item))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not valid:
+        return jsonify({'error': 'No valid incidents provided', 'errors': errors}), 400
+    
+    results, created = bulk_ingest_incidents([item for _, item in valid], current_user.id)
+    db.session.commit()
+    invalidate_stats()
+    if created:
+        get_event_bus().publish('incidents_bulk_created', {'count': len(created)})
+    
+    # One batched notification for the whole request, covering new incidents only
+    recipients = staff_emails()
+    
+    if recipients and created:
+        send_bulk_incident_notification(created, recipients)
+    
+    return jsonify({
+        'message': f'{len(created)} incidents created, {len(results) - len(created)} duplicates recorded',
+        'created': [dict(result, index=index) for (index, _), result in zip(valid, results)],
+        'errors': errors
+    }), 207 if errors else 201
+
 # API route to update an incident
 @api_bp.route('/incidents/<int:incident_id>', methods=['PUT'])
 @api_login_required
@@ -118,13 +298,36 @@ def update_incident(incident_id):
     if 'incident_type' in data:
         incident.incident_type = data['incident_type']
     
+    record_changes(incident, current_user.id)
     db.session.commit()
+    invalidate_stats()
+    publish_incident_event('incident_updated', incident)
     
     return jsonify({
         'message': 'Incident updated successfully',
         'incident': incident.to_dict()
     })
 
+# API route to delete an incident
+@api_bp.route('/incidents/<int:incident_id>', methods=['DELETE'])
+@api_login_required
+def delete_incident(incident_id):
+    incident = Incident.query.get_or_404(incident_id)
+    
+    # Check if user has permission to delete
+    if current_user.role not in ['admin', 'manager']:
+        return jsonify({'error': 'You do not have permission to delete this incident'}), 403
+    
+    status = incident.status
+    record_event(incident, 'deleted', from_value=status, actor_id=current_user.id)
+    db.session.delete(incident)
+    record_tombstones([incident_id])
+    db.session.commit()
+    invalidate_stats()
+    get_event_bus().publish('incident_deleted', {'id': incident_id, 'status': status})
+    
+    return jsonify({'message': 'Incident deleted successfully'})
+
 # API route to assign an incident
 @api_bp.route('/incidents/<int:incident_id>/assign', methods=['POST'])
 @api_login_required
@@ -145,9 +348,14 @@ def assign_incident(incident_id):
     if not assignee:
         return jsonify({'error': 'Invalid assignee_id'}), 400
     
+    previous_status = incident.status
     incident.assignee_id = assignee.id
     incident.status = 'in_progress'
+    record_changes(incident, current_user.id)
     db.session.commit()
+    invalidate_stats()
+    publish_incident_event('incident_assigned', incident, assignee_name=assignee.username,
+                           previous_status=previous_status)
     
     # Send email notification to assignee
     send_assignment_notification(incident, [assignee.email])
@@ -177,18 +385,22 @@ def update_status(incident_id):
     if status not in ['open', 'in_progress', 'resolved', 'closed']:
         return jsonify({'error': 'Invalid status value'}), 400
     
+    previous_status = incident.status
     incident.status = status
     
     if status == 'resolved':
         incident.resolved_at = datetime.utcnow()
     
+    record_changes(incident, current_user.id)
     db.session.commit()
+    invalidate_stats()
+    publish_incident_event('incident_status', incident, previous_status=previous_status)
     
     # Send email notification to creator and stakeholders
-    recipients = [User.query.get(incident.creator_id).email]
+    user_ids = [incident.creator_id]
     if incident.assignee_id and incident.assignee_id != current_user.id:
-        assignee = User.query.get(incident.assignee_id)
-        recipients.append(assignee.email)
+        user_ids.append(incident.assignee_id)
+    recipients = emails_for_users(user_ids)
     
     if recipients:
         send_status_update_notification(incident, recipients)
@@ -209,14 +421,9 @@ def add_comment(incident_id):
     if not data or 'content' not in data:
         return jsonify({'error': 'No comment content provided'}), 400
     
-    comment = Comment(
-        content=data['content'],
-        incident_id=incident_id,
-        author_id=current_user.id
-    )
-    
-    db.session.add(comment)
+    comment = create_comment(incident, data['content'], current_user.id)
     db.session.commit()
+    publish_comment_event(comment, current_user.username)
     
     return jsonify({
         'message': 'Comment added successfully',
@@ -224,7 +431,7 @@ def add_comment(incident_id):
             'id': comment.id,
             'content': comment.content,
             'author_id': comment.author_id,
-            'author_name': User.query.get(comment.author_id).username,
+            'author_name': current_user.username,
             'created_at': comment.created_at.isoformat()
         }
     }), 201
@@ -232,17 +439,183 @@ def add_comment(incident_id):
 # API route to get comments for an incident
 @api_bp.route('/incidents/<int:incident_id>/comments', methods=['GET'])
 @api_login_required
+@read_only
 def get_comments(incident_id):
-    incident = Incident.query.get_or_404(incident_id)
+    # Long-closed incidents keep their comments in the archive
+    incident = Incident.query.get(incident_id)
+    model = Comment
+    if not incident:
+        incident = find_archived_incident(incident_id)
+        if not incident:
+            return jsonify({'error': 'Incident not found'}), 404
+        model = ArchivedComment
+    
+    try:
+        limit = parse_limit(request.args.get('limit', ''), default=COMMENT_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Comments are append-only, so the counters on the incident identify
+    # every page without reading the comment table
+    etag = make_etag('comments', request.full_path, incident.comment_count, incident.last_activity_at)
+    response = not_modified(etag)
+    if response:
+        return response
+    
+    try:
+        comments, next_cursor = comment_page(comment_rows(model, incident_id), model, limit,
+                                             request.args.get('cursor', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return with_etag(jsonify({
+        'comments': [row_to_dict(comment, COMMENT_FIELDS) for comment in comments],
+        'comment_count': incident.comment_count,
+        'next_cursor': next_cursor
+    }), etag)
+
+# API route to get the change history of an incident
+@api_bp.route('/incidents/<int:incident_id>/events', methods=['GET'])
+@api_login_required
+@read_only
+def get_incident_events(incident_id):
+    events = IncidentEvent.query.filter_by(incident_id=incident_id).order_by(IncidentEvent.id).all()
+    
+    # History outlives the incident, so only 404 when there is neither
+    if not events and not Incident.query.get(incident_id) and not find_archived_incident(incident_id):
+        return jsonify({'error': 'Incident not found'}), 404
+    
+    return jsonify({'events': [event.to_dict() for event in events]})
+
+# API route to get overall MTTA/MTTR figures
+@api_bp.route('/analytics/summary', methods=['GET'])
+@rate_budget('expensive')
+@api_login_required
+@read_only
+def analytics_summary():
+    return jsonify(get_analytics().summary())
+
+# API route to get MTTA/MTTR figures broken down by priority, type or assignee
+@api_bp.route('/analytics/<dimension>', methods=['GET'])
+@rate_budget('expensive')
+@api_login_required
+@read_only
+def analytics_breakdown(dimension):
+    if dimension not in DIMENSIONS:
+        return jsonify({'error': f'Unknown dimension: {dimension}'}), 404
     
-    comments = Comment.query.filter_by(incident_id=incident_id).order_by(Comment.created_at).all()
+    return jsonify({dimension: get_analytics().breakdown(dimension)})
+
+# API route to export incidents or their events as CSV, NDJSON or Parquet
+@api_bp.route('/export', methods=['GET'])
+@rate_budget('expensive')
+@api_login_required
+@read_only
+def export():
+    format = request.args.get('format', 'csv')
+    dataset = request.args.get('dataset', 'incidents')
+    
+    if format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {format}'}), 400
+    
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': f'Unknown dataset: {dataset}'}), 400
+    
+    rows = export_rows(format, dataset,
+                       request.args.get('status', ''),
+                       request.args.get('priority', ''),
+                       request.args.get('type', ''))
+    filename = f'{dataset}-{datetime.utcnow():%Y%m%d%H%M%S}.{format}'
+    
+    response = Response(stream_with_context(rows), mimetype=EXPORT_FORMATS[format])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+# API route streaming live incident events as Server-Sent Events. Each client
+# holds a WSGI thread for as long as it stays connected, so only
+# STREAM_MAX_WSGI_CLIENTS are served at once and the rest are told to retry;
+# under ASGI the handler in app/asgi.py serves streams without threads.
+@api_bp.route('/stream', methods=['GET'])
+@api_login_required
+def stream():
+    keepalive = current_app.config.get('STREAM_KEEPALIVE', DEFAULT_KEEPALIVE)
+    slots = current_app.extensions['event_stream_slots']
+    if not slots.acquire(blocking=False):
+        # EventSource gives up on an error status, so answer 200 and ask it
+        # to come back later instead
+        response = Response(f'retry: {keepalive * 4000}\n\n', mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    response = Response(event_stream(get_event_bus(), last_event_id, keepalive), mimetype='text/event-stream')
+    response.call_on_close(slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# API route to choose between immediate and digest email notifications
+@api_bp.route('/users/me/notifications', methods=['PUT'])
+@api_login_required
+def update_notification_mode():
+    data = request.get_json()
+    
+    if not data or data.get('mode') not in ['immediate', 'digest']:
+        return jsonify({'error': 'mode must be "immediate" or "digest"'}), 400
+    
+    # current_user is a cached snapshot; committing the change refreshes it
+    user = User.query.get(current_user.id)
+    user.notification_mode = data['mode']
+    db.session.commit()
     
     return jsonify({
-        'comments': [{
-            'id': comment.id,
-            'content': comment.content,
-            'author_id': comment.author_id,
-            'author_name': User.query.get(comment.author_id).username,
-            'created_at': comment.created_at.isoformat()
-        } for comment in comments]
-    })
\ No newline at end of file
+        'message': f'Notification mode set to {data["mode"]}',
+        'mode': user.notification_mode
+    })
+
+# API route to list the current user's API tokens
+@api_bp.route('/tokens', methods=['GET'])
+@api_login_required
+def get_tokens():
+    tokens = ApiToken.query.filter_by(user_id=current_user.id).order_by(ApiToken.id)
+    return jsonify([api_token.to_dict() for api_token in tokens])
+
+# API route to issue an API token; the token is only ever returned here
+@api_bp.route('/tokens', methods=['POST'])
+@api_login_required
+def create_token():
+    # Tokens can't mint further tokens, so a leaked one can't outlive its revocation
+    if current_user.token_id is not None:
+        return jsonify({'error': 'Tokens can only be issued from a signed-in session'}), 403
+    
+    data = request.get_json()
+    if not data or not data.get('name'):
+        return jsonify({'error': 'name is required'}), 400
+    
+    try:
+        scopes = parse_scopes(data.get('scopes', ['read']))
+        expires_in_days = data.get('expires_in_days')
+        if expires_in_days is not None and (not isinstance(expires_in_days, int) or expires_in_days < 1):
+            raise ValueError('expires_in_days must be a positive integer')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    expires_at = datetime.utcnow() + timedelta(days=expires_in_days) if expires_in_days else None
+    token, api_token = issue_token(current_user.id, data['name'][:64], scopes, expires_at)
+    db.session.commit()
+    
+    return jsonify({'token': token, 'api_token': api_token.to_dict()}), 201
+
+# API route to revoke an API token
+@api_bp.route('/tokens/<int:token_id>', methods=['DELETE'])
+@api_login_required
+def revoke_token(token_id):
+    api_token = ApiToken.query.get(token_id)
+    if not api_token or (api_token.user_id != current_user.id and current_user.role != 'admin'):
+        return jsonify({'error': 'Token not found'}), 404
+    
+    if api_token.revoked_at is None:
+        api_token.revoked_at = datetime.utcnow()
+        db.session.commit()
+    
+    return jsonify(api_token.to_dict())
@@ -1,10 +1,20 @@
 # app/routes/incidents.py
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, abort
 from flask_login import login_required, current_user
 from app.models.incident import Incident
 from app.models.user import User
 from app.models.comment import Comment
+from app.models.archive import ArchivedComment
 from app.database import db
+from app.queries import filter_incidents, keyset_page, with_people, comment_timeline, COMMENT_PAGE_SIZE, \
+    comment_page, create_comment
+from app.search import search_incidents
+from app.stats import get_stats, invalidate_stats
+from app.replicas import read_only
+from app.archive import find_archived_incident, archived_comment_timeline
+from app.analytics import record_event, record_changes
+from app.events import publish_incident_event, publish_comment_event
+from app.recipients import staff_emails, emails_for_users
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, SelectField, SubmitField
 from wtforms.validators import DataRequired
@@ -13,6 +23,10 @@ from app.email_service import send_incident_notification, send_assignment_notifi
 
 incidents_bp = Blueprint('incidents', __name__)
 
+DASHBOARD_PAGE_SIZE = 25
+LIST_PAGE_SIZE = 50
+SEARCH_PAGE_SIZE = 25
+
 class IncidentForm(FlaskForm):
     title = StringField('Title', validators=[DataRequired()])
     description = TextAreaField('Description', validators=[DataRequired()])
@@ -38,56 +52,74 @@ class CommentForm(FlaskForm):
 
 @incidents_bp.route('/dashboard')
 @login_required
+@read_only
 def dashboard():
-    # Get open incidents for the dashboard
-    open_incidents = Incident.query.filter(Incident.status != 'closed').order_by(Incident.created_at.desc()).all()
+    page_size = current_app.config.get('DASHBOARD_PAGE_SIZE', DASHBOARD_PAGE_SIZE)
+    
+    # Get a page of open incidents for the dashboard
+    try:
+        open_incidents, next_cursor = keyset_page(with_people(Incident.query).filter(Incident.status != 'closed'),
+                                                  page_size, request.args.get('cursor'))
+    except ValueError:
+        return redirect(url_for('incidents.dashboard'))
     
-    # Get statistics
-    total_incidents = Incident.query.count()
-    open_count = Incident.query.filter_by(status='open').count()
-    in_progress_count = Incident.query.filter_by(status='in_progress').count()
-    resolved_count = Incident.query.filter_by(status='resolved').count()
-    closed_count = Incident.query.filter_by(status='closed').count()
+    # Get statistics from the cached snapshot
+    stats = get_stats()
     
     # Get incidents assigned to current user
-    my_incidents = Incident.query.filter_by(assignee_id=current_user.id).filter(Incident.status != 'closed').all()
+    my_incidents = with_people(Incident.query).filter_by(assignee_id=current_user.id).filter(Incident.status != 'closed') \
+        .order_by(Incident.created_at.desc()).limit(page_size).all()
     
     # Get recent incidents created by current user
-    created_incidents = Incident.query.filter_by(creator_id=current_user.id).order_by(Incident.created_at.desc()).limit(5).all()
+    created_incidents = with_people(Incident.query).filter_by(creator_id=current_user.id).order_by(Incident.created_at.desc()).limit(5).all()
     
     return render_template('incidents/dashboard.html', 
                           title='Dashboard',
                           open_incidents=open_incidents,
+                          next_cursor=next_cursor,
                           my_incidents=my_incidents,
                           created_incidents=created_incidents,
-                          total_incidents=total_incidents,
-                          open_count=open_count,
-                          in_progress_count=in_progress_count,
-                          resolved_count=resolved_count,
-                          closed_count=closed_count)
+                          stats=stats,
+                          total_incidents=stats['total'],
+                          open_count=stats['by_status']['open'],
+                          in_progress_count=stats['by_status']['in_progress'],
+                          resolved_count=stats['by_status']['resolved'],
+                          closed_count=stats['by_status']['closed'])
 
 @incidents_bp.route('/incidents')
 @login_required
+@read_only
 def list_incidents():
     # Filter incidents based on query parameters
     status = request.args.get('status', '')
     priority = request.args.get('priority', '')
     type = request.args.get('type', '')
+    q = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    next_page = None
+    next_cursor = None
     
-    query = Incident.query
-    
-    if status:
-        query = query.filter_by(status=status)
-    if priority:
-        query = query.filter_by(priority=priority)
-    if type:
-        query = query.filter_by(incident_type=type)
+    query = filter_incidents(with_people(Incident.query), status, priority, type)
     
-    incidents = query.order_by(Incident.created_at.desc()).all()
+    if q:
+        # Ranked full-text matches, one page at a time
+        incidents, _, has_next = search_incidents(q, page, SEARCH_PAGE_SIZE, query)
+        next_page = page + 1 if has_next else None
+    else:
+        # Newest first, one keyset page at a time like the dashboard
+        try:
+            incidents, next_cursor = keyset_page(query, current_app.config.get('LIST_PAGE_SIZE', LIST_PAGE_SIZE),
+                                                 request.args.get('cursor'))
+        except ValueError:
+            return redirect(url_for('incidents.list_incidents', status=status, priority=priority, type=type))
     
     return render_template('incidents/list.html', 
                           title='All Incidents', 
                           incidents=incidents,
+                          search_query=q,
+                          page=page,
+                          next_page=next_page,
+                          next_cursor=next_cursor,
                           status_filter=status,
                           priority_filter=priority,
                           type_filter=type)
@@ -108,12 +140,14 @@ def create_incident():
         )
         
         db.session.add(incident)
+        db.session.flush()
+        record_event(incident, 'created', to_value=incident.status, actor_id=current_user.id)
         db.session.commit()
+        invalidate_stats()
+        publish_incident_event('incident_created', incident)
         
         # Send email notification to admins and managers
-        admin_emails = [user.email for user in User.query.filter_by(role='admin').all()]
-        manager_emails = [user.email for user in User.query.filter_by(role='manager').all()]
-        recipients = admin_emails + manager_emails
+        recipients = staff_emails()
         
         if recipients:
             send_incident_notification(incident, recipients)
@@ -126,14 +160,31 @@ def create_incident():
 
 @incidents_bp.route('/incidents/<int:incident_id>')
 @login_required
+@read_only
 def view_incident(incident_id):
-    incident = Incident.query.get_or_404(incident_id)
-    comments = Comment.query.filter_by(incident_id=incident_id).order_by(Comment.created_at).all()
+    incident = with_people(Incident.query).filter(Incident.id == incident_id).first()
+    archived = incident is None
+    
+    if archived:
+        # Long-closed incidents are shown read-only from the archive
+        incident = find_archived_incident(incident_id)
+        if not incident:
+            abort(404)
+        query, model = archived_comment_timeline(incident_id), ArchivedComment
+    else:
+        query, model = comment_timeline(incident), Comment
+    
+    # Only the newest page of comments; older ones load through the API
+    comments, older_cursor = comment_page(query, model, COMMENT_PAGE_SIZE)
+    comments.reverse()
+    
     comment_form = CommentForm()
     return render_template('incidents/view.html', 
                           title=incident.title, 
                           incident=incident, 
+                          archived=archived,
                           comments=comments, 
+                          older_cursor=older_cursor,
                           comment_form=comment_form)
 
 @incidents_bp.route('/incidents/<int:incident_id>/edit', methods=['GET', 'POST'])
@@ -156,7 +207,10 @@ def edit_incident(incident_id):
         incident.priority = form.priority.data
         incident.incident_type = form.incident_type.data
         
+        record_changes(incident, current_user.id)
         db.session.commit()
+        invalidate_stats()
+        publish_incident_event('incident_updated', incident)
         
         flash('Incident updated successfully!')
         return redirect(url_for('incidents.view_incident', incident_id=incident.id))
@@ -176,14 +230,9 @@ def add_comment(incident_id):
     form = CommentForm()
     
     if form.validate_on_submit():
-        comment = Comment(
-            content=form.content.data,
-            incident_id=incident_id,
-            author_id=current_user.id
-        )
-        
-        db.session.add(comment)
+        comment = create_comment(incident, form.content.data, current_user.id)
         db.session.commit()
+        publish_comment_event(comment, current_user.username)
         
         flash('Comment added successfully!')
     
@@ -205,13 +254,18 @@ def assign_incident(incident_id):
         assignee_id = request.form.get('assignee_id')
         
         if assignee_id:
+            previous_status = incident.status
             incident.assignee_id = assignee_id
             incident.status = 'in_progress'
+            record_changes(incident, current_user.id)
             db.session.commit()
+            invalidate_stats()
             
             # Send email notification to assignee
             assignee = User.query.get(assignee_id)
             if assignee:
+                publish_incident_event('incident_assigned', incident, assignee_name=assignee.username,
+                                       previous_status=previous_status)
                 send_assignment_notification(incident, [assignee.email])
             
             flash('Incident assigned successfully!')
@@ -238,13 +292,16 @@ def update_status(incident_id):
         if status == 'resolved':
             incident.resolved_at = datetime.utcnow()
         
+        record_changes(incident, current_user.id)
         db.session.commit()
+        invalidate_stats()
+        publish_incident_event('incident_status', incident, previous_status=old_status)
         
         # Send email notification to creator and stakeholders
-        recipients = [User.query.get(incident.creator_id).email]
+        user_ids = [incident.creator_id]
         if incident.assignee_id and incident.assignee_id != current_user.id:
-            assignee = User.query.get(incident.assignee_id)
-            recipients.append(assignee.email)
+            user_ids.append(incident.assignee_id)
+        recipients = emails_for_users(user_ids)
         
         if recipients:
             send_status_update_notification(incident, recipients)
@@ -0,0 +1,182 @@
+# app/search.py
+import re
+import click
+from flask import current_app
+from sqlalchemy import DDL, Float, Integer, bindparam, column, event, func, literal, literal_column, or_, select, \
+    table, text, union_all
+from app.database import db
+from app.models.incident import Incident
+from app.models.comment import Comment
+
+# SQLite keeps two external-content FTS5 indexes, one over incident text and
+# one over comments, maintained by triggers so every write path (ORM, bulk
+# inserts, archival) stays in sync without application code
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS incident_fts USING fts5("
+    "title, description, content='incident', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comment_fts USING fts5("
+    "content, content='comment', content_rowid='id', tokenize='porter unicode61')",
+    "INSERT INTO incident_fts(incident_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "CREATE TRIGGER IF NOT EXISTS incident_fts_ai AFTER INSERT ON incident BEGIN "
+    "INSERT INTO incident_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS incident_fts_ad AFTER DELETE ON incident BEGIN "
+    "INSERT INTO incident_fts(incident_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS incident_fts_au AFTER UPDATE OF title, description ON incident BEGIN "
+    "INSERT INTO incident_fts(incident_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO incident_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS comment_fts_ai AFTER INSERT ON comment BEGIN "
+    "INSERT INTO comment_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS comment_fts_ad AFTER DELETE ON comment BEGIN "
+    "INSERT INTO comment_fts(comment_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS comment_fts_au AFTER UPDATE OF content ON comment BEGIN "
+    "INSERT INTO comment_fts(comment_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO comment_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+# Postgres indexes the tsvector expressions directly, so no triggers are needed
+POSTGRES_SEARCH_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_incident_search ON incident USING gin "
+    "(to_tsvector('english', title || ' ' || description))",
+    "CREATE INDEX IF NOT EXISTS ix_comment_search ON comment USING gin "
+    "(to_tsvector('english', content))",
+]
+
+# Only the SEARCH_CANDIDATE_LIMIT best matches of each index are kept, so a
+# page never sorts more than twice that many incidents however common the
+# term is. The cut is by rank and after the caller's filters, so it is the
+# same for every page of a query and always holds the best matches.
+DEFAULT_CANDIDATE_LIMIT = 2000
+
+incident_table = Incident.__table__
+comment_table = Comment.__table__
+incident_fts = table('incident_fts', column('rowid', Integer), column('rank', Float))
+comment_fts = table('comment_fts', column('rowid', Integer), column('rank', Float))
+
+# Postgres needs the exact expressions of the GIN indexes above to use them
+INCIDENT_DOCUMENT = literal_column("to_tsvector('english', incident.title || ' ' || incident.description)")
+COMMENT_DOCUMENT = literal_column("to_tsvector('english', comment.content)")
+
+def _filtered(statement, left, incident_id, where):
+    # Applies the caller's incident filters inside a candidate query
+    if where is None:
+        return statement
+    if left is incident_table:
+        return statement.where(where)
+    return statement.join_from(left, incident_table, incident_table.c.id == incident_id).where(where)
+
+def _sqlite_candidates(query, where, limit):
+    # Title hits weigh more than description hits (see the 'rank' option
+    # above), which weigh more than comment hits. FTS5 ranks lower is better.
+    match = bindparam('query', query)
+    incidents = _filtered(
+        select(incident_fts.c.rowid.label('incident_id'), incident_fts.c.rank).select_from(incident_fts)
+        .where(literal_column('incident_fts').op('MATCH')(match)),
+        incident_fts, incident_fts.c.rowid, where
+    ).order_by(incident_fts.c.rank, incident_fts.c.rowid.desc()).limit(limit)
+    comments = _filtered(
+        select(comment_table.c.incident_id, (comment_fts.c.rank * 0.5).label('rank'))
+        .select_from(comment_fts.join(comment_table, comment_table.c.id == comment_fts.c.rowid))
+        .where(literal_column('comment_fts').op('MATCH')(match)),
+        comment_table, comment_table.c.incident_id, where
+    ).order_by(comment_fts.c.rank, comment_fts.c.rowid.desc()).limit(limit)
+    return incidents, comments
+
+def _postgres_candidates(query, where, limit):
+    # Higher ts_rank is better
+    tsquery = func.websearch_to_tsquery(literal_column("'english'"), bindparam('query', query))
+    incident_rank = func.ts_rank(INCIDENT_DOCUMENT, tsquery)
+    incidents = _filtered(
+        select(incident_table.c.id.label('incident_id'), incident_rank.label('rank'))
+        .where(INCIDENT_DOCUMENT.op('@@')(tsquery)),
+        incident_table, incident_table.c.id, where
+    ).order_by(incident_rank.desc(), incident_table.c.id.desc()).limit(limit)
+    comment_rank = func.ts_rank(COMMENT_DOCUMENT, tsquery)
+    comments = _filtered(
+        select(comment_table.c.incident_id, (comment_rank * 0.5).label('rank'))
+        .where(COMMENT_DOCUMENT.op('@@')(tsquery)),
+        comment_table, comment_table.c.incident_id, where
+    ).order_by(comment_rank.desc(), comment_table.c.id.desc()).limit(limit)
+    return incidents, comments
+
+def _install(statements, dialect):
+    for statement in statements:
+        event.listen(Comment.__table__, 'after_create', DDL(statement).execute_if(dialect=dialect))
+
+# Both tables exist once comment has been created, which is the last of the two
+_install(SQLITE_SEARCH_DDL, 'sqlite')
+_install(POSTGRES_SEARCH_DDL, 'postgresql')
+
+def _fts5_query(q):
+    # Quote every token so user input can never be parsed as FTS5 syntax
+    tokens = re.findall(r'\w+', q)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"' for token in tokens)
+
+def ranked_matches(q, dialect, where=None):
+    # Returns (hits, best_first): a subquery of one (incident_id, rank) row
+    # per candidate incident matching where, and the order that puts the
+    # best match first; None when q has nothing to search for
+    limit = current_app.config.get('SEARCH_CANDIDATE_LIMIT', DEFAULT_CANDIDATE_LIMIT)
+    if dialect == 'sqlite':
+        query = _fts5_query(q)
+        if query is None:
+            return None
+        incidents, comments = _sqlite_candidates(query, where, limit)
+        best, best_first = func.min, lambda rank: rank
+    else:
+        incidents, comments = _postgres_candidates(q, where, limit)
+        best, best_first = func.max, lambda rank: rank.desc()
+
+    candidates = union_all(select(incidents.subquery()), select(comments.subquery())).subquery('candidates')
+    hits = select(candidates.c.incident_id, best(candidates.c.rank).label('rank')) \
+        .group_by(candidates.c.incident_id).subquery('matches')
+    return hits, best_first(hits.c.rank)
+
+def search_incidents(q, page=1, per_page=20, query=None):
+    # Returns (incidents, ranks, has_next) for one page of ranked results.
+    # The filters on query narrow the candidates before they are ranked and
+    # cut, so every page of a query comes from the same set and a filtered
+    # search finds whatever matches the filters.
+    query = query if query is not None else Incident.query
+    offset = (page - 1) * per_page
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        match = ranked_matches(q, dialect, query.whereclause)
+        if match is None:
+            return [], {}, False
+        hits, best_first = match
+        query = query.join(hits, hits.c.incident_id == Incident.id).add_columns(hits.c.rank) \
+            .order_by(best_first, Incident.id.desc())
+    else:
+        # No full-text support: fall back to a substring match, newest first
+        pattern = f'%{q}%'
+        query = query.filter(or_(Incident.title.ilike(pattern), Incident.description.ilike(pattern))) \
+            .add_columns(literal(0)).order_by(Incident.created_at.desc())
+
+    rows = query.limit(per_page + 1).offset(offset).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return [incident for incident, _ in rows], {incident.id: rank for incident, rank in rows}, has_next
+
+def rebuild_search_index():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text("INSERT INTO incident_fts(incident_fts) VALUES ('rebuild')"))
+        db.session.execute(text("INSERT INTO comment_fts(comment_fts) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            db.session.execute(text(statement))
+    db.session.commit()
+
+def init_search(app):
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Create and rebuild the full-text search index."""
+        rebuild_search_index()
+        click.echo('Search index rebuilt.')
@@ -0,0 +1,49 @@
+# app/serialization.py
+import json
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder below writes the same JSON, only slower
+    orjson = None
+
+def json_default(value):
+    # Dates as ISO 8601, as the models' to_dict methods write them, rather
+    # than Flask's HTTP dates; orjson does the same for datetimes natively
+    if isinstance(value, date):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+def dumps(obj, sort_keys=False, indent=False):
+    # Returns UTF-8 bytes. Rows from app.queries.row_to_dict keep their
+    # datetimes, so encoding them costs no Python per value under orjson.
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=json_default, option=option)
+    return json.dumps(obj, default=json_default, sort_keys=sort_keys, ensure_ascii=False,
+                      indent=2 if indent else None, separators=None if indent else (',', ':')).encode()
+
+class JSONProvider(DefaultJSONProvider):
+    # Flask's JSON provider on top of dumps, so jsonify, request.get_json
+    # and the ASGI handlers all use orjson when it is installed
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', json_default)
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, self.sort_keys).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(dumps(obj, self.sort_keys, indent) + b'\n', mimetype=self.mimetype)
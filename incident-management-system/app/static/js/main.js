@@ -39,4 +39,186 @@ document.addEventListener('DOMContentLoaded', function() {
             badge.classList.add('bg-dark');
         }
     });
-});
\ No newline at end of file
+
+    document.querySelectorAll('[data-load-older]').forEach(function(button) {
+        button.addEventListener('click', function() {
+            loadOlderComments(button);
+        });
+    });
+
+    // Live incident feed: patch the page in place instead of reloading it
+    var streamUrl = document.body.getAttribute('data-stream-url');
+    if (streamUrl && window.EventSource && document.querySelector('[data-incident-id], [data-stat]')) {
+        startLiveFeed(streamUrl);
+    }
+});
+
+var PRIORITY_BADGES = {high: 'bg-danger', medium: 'bg-warning', critical: 'bg-dark', low: 'bg-success'};
+var STATUS_BADGES = {open: 'bg-secondary', in_progress: 'bg-info', resolved: 'bg-success', closed: 'bg-dark'};
+
+function setBadge(badge, value, classes) {
+    Object.keys(classes).forEach(function(key) {
+        badge.classList.remove(classes[key]);
+    });
+    badge.classList.add(classes[value] || 'bg-dark');
+    badge.textContent = value;
+}
+
+function patchIncident(incident) {
+    document.querySelectorAll('[data-incident-id="' + incident.id + '"]').forEach(function(container) {
+        container.querySelectorAll('[data-field]').forEach(function(el) {
+            var field = el.getAttribute('data-field');
+            if (field === 'priority') {
+                setBadge(el, incident.priority, PRIORITY_BADGES);
+            } else if (field === 'status') {
+                setBadge(el, incident.status, STATUS_BADGES);
+            } else if (field === 'assignee') {
+                if (incident.assignee_name) {
+                    el.textContent = incident.assignee_name;
+                }
+            } else if (field in incident) {
+                el.textContent = incident[field];
+            }
+        });
+    });
+}
+
+function adjustStat(name, delta) {
+    var el = document.querySelector('[data-stat="' + name + '"]');
+    if (el) {
+        el.textContent = (parseInt(el.textContent, 10) || 0) + delta;
+    }
+}
+
+function moveStatus(from, to) {
+    if (from && from !== to) {
+        adjustStat(from, -1);
+        adjustStat(to, 1);
+    }
+}
+
+function commentElement(comment) {
+    var item = document.createElement('div');
+    item.className = 'comment mb-3';
+    item.setAttribute('data-comment-id', comment.id);
+    item.innerHTML = '<div class="d-flex"><div class="flex-shrink-0"><div class="avatar bg-light rounded-circle p-2">' +
+        '<i class="fas fa-user"></i></div></div><div class="flex-grow-1 ms-3"><div><strong></strong>' +
+        '<small class="text-muted ms-2"></small></div><p class="mt-2" style="white-space: pre-line"></p></div></div>';
+    item.querySelector('strong').textContent = comment.author_name;
+    item.querySelector('small').textContent = comment.created_at.slice(0, 16).replace('T', ' ');
+    item.querySelector('p').textContent = comment.content;
+    return item;
+}
+
+function appendComment(comment) {
+    var containers = document.querySelectorAll('[data-incident-id="' + comment.incident_id + '"]');
+    var list = containers.length && containers[0].querySelector('[data-comment-list]');
+    if (list && list.querySelector('[data-comment-id="' + comment.id + '"]')) {
+        return;
+    }
+
+    containers.forEach(function(container) {
+        container.querySelectorAll('[data-field="comment_count"]').forEach(function(count) {
+            count.textContent = (parseInt(count.textContent, 10) || 0) + 1;
+        });
+    });
+    if (!list) {
+        return;
+    }
+
+    if (list.children.length) {
+        list.appendChild(document.createElement('hr'));
+    }
+    list.appendChild(commentElement(comment));
+
+    var empty = document.querySelector('[data-no-comments]');
+    if (empty) {
+        empty.classList.add('d-none');
+    }
+}
+
+// Fetches the page of comments before the oldest one shown and puts it on top
+function loadOlderComments(button) {
+    var list = document.querySelector('[data-comment-list]');
+    button.disabled = true;
+    fetch(button.getAttribute('data-url') + '?cursor=' + encodeURIComponent(button.getAttribute('data-cursor')), {
+        credentials: 'same-origin',
+        headers: {'Accept': 'application/json'}
+    }).then(function(response) {
+        return response.json();
+    }).then(function(data) {
+        // Pages come newest first
+        data.comments.forEach(function(comment) {
+            if (list.querySelector('[data-comment-id="' + comment.id + '"]')) {
+                return;
+            }
+            if (list.firstChild) {
+                list.insertBefore(document.createElement('hr'), list.firstChild);
+            }
+            list.insertBefore(commentElement(comment), list.firstChild);
+        });
+        if (data.next_cursor) {
+            button.setAttribute('data-cursor', data.next_cursor);
+            button.disabled = false;
+        } else {
+            button.remove();
+        }
+    }).catch(function() {
+        button.disabled = false;
+    });
+}
+
+function startLiveFeed(url) {
+    var source = new EventSource(url);
+    var newIncidents = 0;
+
+    // New rows would need the page's filters and sort order, so offer a refresh
+    function announce(count) {
+        newIncidents += count;
+        document.querySelectorAll('[data-live-notice]').forEach(function(notice) {
+            notice.textContent = newIncidents + ' new incident' + (newIncidents === 1 ? '' : 's') + ' - refresh';
+            notice.classList.remove('d-none');
+        });
+    }
+
+    function on(type, handler) {
+        source.addEventListener(type, function(e) {
+            handler(JSON.parse(e.data));
+        });
+    }
+
+    on('incident_created', function(incident) {
+        adjustStat('total', 1);
+        adjustStat('open', 1);
+        announce(1);
+    });
+    on('incidents_bulk_created', function(data) {
+        adjustStat('total', data.count);
+        adjustStat('open', data.count);
+        announce(data.count);
+    });
+    on('incident_updated', patchIncident);
+    on('incident_assigned', function(incident) {
+        moveStatus(incident.previous_status, incident.status);
+        patchIncident(incident);
+    });
+    on('incident_status', function(incident) {
+        moveStatus(incident.previous_status, incident.status);
+        patchIncident(incident);
+    });
+    on('comment_added', appendComment);
+    on('incident_deleted', function(incident) {
+        adjustStat('total', -1);
+        adjustStat(incident.status, -1);
+        document.querySelectorAll('tr[data-incident-id="' + incident.id + '"], a[data-incident-id="' + incident.id + '"]')
+            .forEach(function(row) {
+                row.remove();
+            });
+    });
+
+    // We missed more events than the server keeps, so start from a fresh page
+    source.addEventListener('reset', function() {
+        source.close();
+        window.location.reload();
+    });
+}
\ No newline at end of file
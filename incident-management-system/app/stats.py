@@ -0,0 +1,65 @@
+# app/stats.py
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func
+from app.database import db
+from app.models.incident import Incident
+
+STATUSES = ('open', 'in_progress', 'resolved', 'closed')
+PRIORITIES = ('low', 'medium', 'high', 'critical')
+DEFAULT_STATS_TTL = 30
+
+_lock = threading.Lock()
+_snapshot = None
+_expires_at = 0.0
+_generation = 0
+
+def compute_stats():
+    # A single GROUP BY gives every status/priority/type combination at once
+    rows = db.session.query(
+        Incident.status, Incident.priority, Incident.incident_type, func.count(Incident.id)
+    ).group_by(Incident.status, Incident.priority, Incident.incident_type).all()
+
+    by_status = dict.fromkeys(STATUSES, 0)
+    by_priority = dict.fromkeys(PRIORITIES, 0)
+    by_type = {}
+    total = 0
+
+    for status, priority, incident_type, count in rows:
+        total += count
+        by_status[status] = by_status.get(status, 0) + count
+        by_priority[priority] = by_priority.get(priority, 0) + count
+        by_type[incident_type] = by_type.get(incident_type, 0) + count
+
+    return {
+        'total': total,
+        'by_status': by_status,
+        'by_priority': by_priority,
+        'by_type': by_type
+    }
+
+def get_stats():
+    global _snapshot, _expires_at
+
+    now = time.monotonic()
+    snapshot = _snapshot
+    if snapshot is not None and now < _expires_at:
+        return snapshot
+
+    with _lock:
+        if _snapshot is not None and now < _expires_at:
+            return _snapshot
+        generation = _generation
+        snapshot = compute_stats()
+        # Don't publish a snapshot that an invalidation raced past
+        if generation == _generation:
+            _snapshot = snapshot
+            _expires_at = now + current_app.config.get('DASHBOARD_STATS_TTL', DEFAULT_STATS_TTL)
+        return snapshot
+
+def invalidate_stats():
+    global _snapshot, _generation
+
+    _generation += 1
+    _snapshot = None
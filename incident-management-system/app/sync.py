@@ -0,0 +1,107 @@
+# app/sync.py
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from flask import current_app, request
+from sqlalchemy import delete, func, select, tuple_
+from app.database import db
+from app.models.incident import Incident
+from app.models.tombstone import IncidentTombstone
+from app.models.archive import ArchivedIncident
+from app.queries import encode_cursor, decode_cursor
+
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+# updated_at comes from the app's clock when a transaction writes, not when
+# it commits, so a row can turn up with an updated_at older than rows already
+# handed out. Sync tokens are held back this far to pick such rows up.
+DEFAULT_SYNC_SETTLE_SECONDS = 10
+
+def make_etag(*parts):
+    # Strong validator over everything the representation is built from
+    payload = json.dumps(parts, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def not_modified(etag):
+    # A 304 for clients that already hold this version, before any rows load
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        return with_etag(response, etag)
+    return None
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate before reusing it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def collection_version():
+    # Every write bumps updated_at, every delete leaves a tombstone and every
+    # archival run stamps archived_at, so three indexed MAX lookups change
+    # whenever any incident listing could
+    return tuple(db.session.execute(collection_version_statement()).one())
+
+def collection_version_statement():
+    return select(
+        select(func.max(Incident.updated_at)).scalar_subquery(),
+        select(func.max(IncidentTombstone.deleted_at)).scalar_subquery(),
+        select(func.max(ArchivedIncident.archived_at)).scalar_subquery()
+    )
+
+def parse_updated_since(raw):
+    # Accepts an ISO 8601 timestamp or the sync_token of a previous response
+    try:
+        since = datetime.fromisoformat(raw.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            return decode_cursor(raw)
+        except ValueError:
+            raise ValueError('Invalid updated_since') from None
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since, 0
+
+def latest_change_statement():
+    # The newest (updated_at, id), one probe of ix_incident_updated_at_id
+    return select(Incident.updated_at, Incident.id) \
+        .order_by(Incident.updated_at.desc(), Incident.id.desc()).limit(1)
+
+def sync_token(since, since_id, config):
+    # A token for every change up to (since, since_id), but never later than
+    # SYNC_SETTLE_SECONDS ago: the next poll re-reads the settle window, so a
+    # late commit is picked up and only rows that recently changed repeat
+    settle = config.get('SYNC_SETTLE_SECONDS', DEFAULT_SYNC_SETTLE_SECONDS)
+    horizon = datetime.utcnow() - timedelta(seconds=settle)
+    if since is None or (since, since_id) > (horizon, 0):
+        since, since_id = horizon, 0
+    return encode_cursor(since, since_id)
+
+def tombstone_horizon():
+    days = current_app.config.get('TOMBSTONE_RETENTION_DAYS', DEFAULT_TOMBSTONE_RETENTION_DAYS)
+    return datetime.utcnow() - timedelta(days=days)
+
+def changed_page(query, limit, since, since_id):
+    # Walks (updated_at, id) upwards from the token so a client can page
+    # through a large backlog of changes. Pages in between advance to their
+    # last row; the last page's token is held back by sync_token.
+    rows = query.filter(tuple_(Incident.updated_at, Incident.id) > tuple_(since, since_id)) \
+        .order_by(Incident.updated_at, Incident.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        since, since_id = rows[-1].updated_at, rows[-1].id
+    token = encode_cursor(since, since_id) if has_more else sync_token(since, since_id, current_app.config)
+    return rows, token, has_more
+
+def deleted_since(since):
+    return [incident_id for incident_id, in db.session.query(IncidentTombstone.incident_id)
+            .filter(IncidentTombstone.deleted_at > since).order_by(IncidentTombstone.deleted_at)]
+
+def record_tombstones(incident_ids):
+    # Called in the deleting transaction; also prunes tombstones nobody can
+    # still ask for
+    now = datetime.utcnow()
+    db.session.execute(delete(IncidentTombstone).where(IncidentTombstone.deleted_at < tombstone_horizon()))
+    for incident_id in incident_ids:
+        # merge, as SQLite may hand a deleted id out again
+        db.session.merge(IncidentTombstone(incident_id=incident_id, deleted_at=now))
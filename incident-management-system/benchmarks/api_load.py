@@ -0,0 +1,150 @@
+# benchmarks/api_load.py
+#
+# Load-tests the JSON API under both deployment modes, gunicorn with gthread
+# workers (WSGI) and uvicorn serving app/asgi.py (ASGI), against the same
+# seeded SQLite database, and reports requests/sec and latency percentiles.
+#
+#     python benchmarks/api_load.py --rows 50000 --concurrency 128 --duration 15
+import argparse
+import http.client
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from app import create_app
+from app.config import Config
+from app.database import db
+from seed import seed
+
+# run.py and asgi.py sit next to the app package or one level up
+ROOT_DIR = APP_DIR if os.path.exists(os.path.join(APP_DIR, 'run.py')) else os.path.dirname(APP_DIR)
+SECRET_KEY = 'api-load-benchmark'
+
+SERVERS = {
+    'wsgi': lambda port, threads: ['gunicorn', '--bind', f'127.0.0.1:{port}', '--worker-class', 'gthread',
+                                   '--workers', '1', '--threads', str(threads), 'run:app'],
+    'asgi': lambda port, threads: ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                                   '--workers', '1', '--no-access-log']
+}
+
+def session_cookie(app):
+    # A signed Flask session for user 1, the seeded admin, as Flask-Login
+    # would leave it
+    serializer = app.session_interface.get_signing_serializer(app)
+    return f"{app.config['SESSION_COOKIE_NAME']}={serializer.dumps({'_user_id': '1', '_fresh': True})}"
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+def run_load(port, paths, cookie, concurrency, duration):
+    # Each client thread keeps one connection alive and sends requests back to
+    # back until the deadline
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(number):
+        rng = random.Random(number)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', rng.choice(paths), headers={'Cookie': cookie})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the JSON API under WSGI and ASGI serving')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--db', default='/tmp/incident_api_load.db')
+    parser.add_argument('--modes', default='wsgi,asgi', help='Comma separated subset of wsgi,asgi.')
+    parser.add_argument('--concurrency', type=int, default=128)
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds of load per mode.')
+    parser.add_argument('--threads', type=int, default=64, help='gthread threads for the WSGI mode.')
+    parser.add_argument('--port', type=int, default=5077)
+    args = parser.parse_args()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{args.db}'
+        SECRET_KEY = SECRET_KEY
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        if not os.path.exists(args.db):
+            db.create_all()
+            seed(users=20, incidents=args.rows, comments=0)
+            print(f'seeded {args.rows} incidents into {args.db}')
+    cookie = session_cookie(app)
+
+    paths = ['/api/incidents?limit=50', '/api/incidents?status=open&limit=20',
+             '/api/incidents?priority=critical&fields=id,title,status']
+    paths += [f'/api/incidents/{n}' for n in random.Random(7).sample(range(1, args.rows + 1), 50)]
+
+    # Every client is the same user, so the per-client rate limits are off
+    env = dict(os.environ, APP_ENV='production', DATABASE_URL=f'sqlite:///{args.db}', SECRET_KEY=SECRET_KEY,
+               RATE_LIMIT_ENABLED='false', PYTHONPATH=os.pathsep.join([APP_DIR, ROOT_DIR]))
+    results = {}
+    for mode in args.modes.split(','):
+        server = subprocess.Popen(SERVERS[mode](args.port, args.threads), cwd=ROOT_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(args.port)
+            run_load(args.port, paths, cookie, min(args.concurrency, 8), 2)  # warm up
+            latencies, errors, elapsed = run_load(args.port, paths, cookie, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies.sort()
+        results[mode] = len(latencies) / elapsed
+        print(f'{mode}: {len(latencies)} requests, {errors} errors')
+        print(f'  req/s: {results[mode]:.0f}')
+        print(f'  p50:   {statistics.median(latencies) * 1000:.1f}ms')
+        print(f'  p99:   {percentile(latencies, 0.99) * 1000:.1f}ms')
+
+    if len(results) == 2:
+        print(f'asgi/wsgi throughput: {results["asgi"] / results["wsgi"]:.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# benchmarks/bench_queries.py
+from app.models.incident import Incident
+from app.queries import INCIDENT_FIELDS, filter_incidents, with_people, project, keyset_page
+from app.stats import compute_stats
+
+def bench_keyset_page(benchmark, app_context):
+    query = project(Incident.query, INCIDENT_FIELDS)
+    benchmark(keyset_page, query, 50)
+
+def bench_filtered_page(benchmark, app_context):
+    query = project(filter_incidents(Incident.query, 'open', 'critical'), INCIDENT_FIELDS)
+    benchmark(keyset_page, query, 50)
+
+def bench_dashboard_open_page(benchmark, app_context):
+    query = with_people(Incident.query).filter(Incident.status != 'closed')
+    benchmark(keyset_page, query, 25)
+
+def bench_compute_stats(benchmark, app_context):
+    benchmark(compute_stats)
+
+def bench_api_list(benchmark, client):
+    response = benchmark(client.get, '/api/incidents?limit=50')
+    assert response.status_code == 200
+
+def bench_api_get(benchmark, client):
+    response = benchmark(client.get, '/api/incidents/42')
+    assert response.status_code == 200
+
+def bench_dashboard_page(benchmark, client):
+    response = benchmark(client.get, '/dashboard')
+    assert response.status_code == 200
+
+def bench_incident_list_page(benchmark, client):
+    response = benchmark(client.get, '/incidents?status=open')
+    assert response.status_code == 200
+
+def bench_incident_view_page(benchmark, client):
+    response = benchmark(client.get, '/incidents/42')
+    assert response.status_code == 200
@@ -0,0 +1,48 @@
+# benchmarks/bench_serialization.py
+#
+# The bench_encode_* benchmarks encode the same 500 incidents end to end,
+# from loaded objects to JSON bytes; divide by ENCODE_ROWS for the per-row
+# cost of each path.
+import json
+from flask import jsonify
+from app import serialization
+from app.models.incident import Incident
+from app.queries import INCIDENT_FIELDS, project, keyset_page, row_to_dict
+
+ENCODE_ROWS = 500
+
+def bench_incident_to_dict(benchmark, app_context):
+    incidents = Incident.query.limit(500).all()
+    benchmark(lambda: [incident.to_dict() for incident in incidents])
+
+def bench_row_to_dict(benchmark, app_context):
+    rows, _ = keyset_page(project(Incident.query, INCIDENT_FIELDS), 500)
+    benchmark(lambda: [row_to_dict(row, INCIDENT_FIELDS) for row in rows])
+
+def bench_json_dumps_page(benchmark, app_context):
+    page = [incident.to_dict() for incident in Incident.query.limit(500).all()]
+    benchmark(json.dumps, {'incidents': page}, separators=(',', ':'))
+
+def bench_jsonify_page(benchmark, app):
+    with app.test_request_context():
+        page = [incident.to_dict() for incident in Incident.query.limit(500).all()]
+        benchmark(jsonify, {'incidents': page})
+
+def bench_encode_orm_stdlib(benchmark, app_context):
+    # ORM instances through to_dict and the stdlib encoder, as the API used to
+    incidents = Incident.query.limit(ENCODE_ROWS).all()
+    benchmark.extra_info['rows'] = len(incidents)
+    benchmark(lambda: json.dumps([incident.to_dict() for incident in incidents], separators=(',', ':')).encode())
+
+def bench_encode_rows(benchmark, app_context):
+    # Plain rows through row_to_dict and app.serialization, as the API does now
+    rows, _ = keyset_page(project(Incident.query, INCIDENT_FIELDS), ENCODE_ROWS)
+    benchmark.extra_info['rows'] = len(rows)
+    benchmark(lambda: serialization.dumps([row_to_dict(row, INCIDENT_FIELDS) for row in rows]))
+
+def bench_encode_rows_fallback(benchmark, app_context, monkeypatch):
+    # The same without orjson installed
+    monkeypatch.setattr(serialization, 'orjson', None)
+    rows, _ = keyset_page(project(Incident.query, INCIDENT_FIELDS), ENCODE_ROWS)
+    benchmark.extra_info['rows'] = len(rows)
+    benchmark(lambda: serialization.dumps([row_to_dict(row, INCIDENT_FIELDS) for row in rows]))
@@ -0,0 +1,50 @@
+# benchmarks/bench_templates.py
+#
+# Renders incidents/list.html over the same 5k incidents with the fragment
+# cache off (every row rendered), cold (cleared before each round, so rows
+# are rendered and stored) and warm (every row served from the cache).
+import pytest
+from flask import render_template
+from flask_login import login_user
+from app.models.incident import Incident
+from app.principals import load_principal
+from app.queries import with_people
+
+LIST_ROWS = 5000
+
+@pytest.fixture
+def list_page(app):
+    # Renders the list page as user 1 would see it, minus the query
+    with app.test_request_context('/incidents'):
+        login_user(load_principal(1))
+        incidents = with_people(Incident.query).order_by(Incident.created_at.desc()).limit(LIST_ROWS).all()
+
+        def render():
+            return render_template('incidents/list.html', incidents=incidents, search_query='', status_filter='',
+                                   priority_filter='', type_filter='', page=1, next_page=None)
+        render.rows = len(incidents)
+        yield render
+
+@pytest.fixture
+def fragment_cache(app):
+    cache = app.extensions['fragment_cache']
+    cache.clear()
+    yield cache
+    app.jinja_env.fragment_cache = cache
+    cache.clear()
+
+def bench_list_render_uncached(benchmark, app, list_page, fragment_cache):
+    app.jinja_env.fragment_cache = None
+    benchmark(list_page)
+
+def bench_list_render_cold_cache(benchmark, list_page, fragment_cache):
+    benchmark.pedantic(list_page, setup=fragment_cache.clear, rounds=20)
+
+def bench_list_render_warm_cache(benchmark, list_page, fragment_cache):
+    list_page()
+    hits, misses = fragment_cache.hits, fragment_cache.misses
+    list_page()
+    # The second render serves every row it shows from the cache
+    assert fragment_cache.hits - hits == list_page.rows
+    assert fragment_cache.misses == misses
+    benchmark(list_page)
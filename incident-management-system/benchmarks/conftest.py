@@ -0,0 +1,46 @@
+# benchmarks/conftest.py
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.config import TestingConfig
+from app.database import db
+from seed import seed
+
+# Size of the seeded dataset; keep it fixed between a baseline and a comparison
+BENCH_INCIDENTS = int(os.environ.get('BENCH_INCIDENTS', 20000))
+BENCH_DB = os.environ.get('BENCH_DB', '/tmp/incident_microbench.db')
+
+class BenchmarkConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{BENCH_DB}'
+    METRICS_ENABLED = False
+
+@pytest.fixture(scope='session')
+def app():
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        seed(users=20, incidents=BENCH_INCIDENTS, comments=2)
+        db.session.remove()
+    yield app
+    os.remove(BENCH_DB)
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    # Logged in as user 1, the seeded admin
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
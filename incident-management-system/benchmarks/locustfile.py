@@ -0,0 +1,81 @@
+# benchmarks/locustfile.py
+#
+# Drives the HTML pages and the JSON API of a running server with a mix of
+# responders browsing and updating incidents. Seed the server's database with
+# benchmarks/seed.py first; every seeded user logs in with seed.PASSWORD.
+#
+#     python benchmarks/seed.py --db /tmp/load.db --incidents 100000
+#     DATABASE_URL=sqlite:////tmp/load.db gunicorn ... run:app
+#     locust -f benchmarks/locustfile.py --host http://127.0.0.1:5000 \
+#         --headless --users 100 --spawn-rate 20 --run-time 2m --csv /tmp/load
+#
+# SEED_USERS and SEED_INCIDENTS must match what was seeded. With more simulated
+# users than seeded ones several share a login, and so its API rate limits;
+# raise RATE_LIMIT_* or set RATE_LIMIT_ENABLED=false on the server to measure
+# raw capacity rather than the limiter.
+import os
+import random
+import re
+
+from locust import HttpUser, between, task
+
+SEED_USERS = int(os.environ.get('SEED_USERS', 20))
+SEED_INCIDENTS = int(os.environ.get('SEED_INCIDENTS', 10000))
+PASSWORD = 'benchmark'
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+STATUSES = ('open', 'in_progress', 'resolved', 'closed')
+SEARCHES = ('database outage', 'replica lag', 'certificate expired', 'dns', 'payment api error')
+
+class Responder(HttpUser):
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        response = self.client.get('/login', name='/login')
+        token = CSRF_TOKEN.search(response.text)
+        self.client.post('/login', name='/login', data={
+            'csrf_token': token.group(1) if token else '',
+            'username': f'user{random.randint(1, SEED_USERS)}',
+            'password': PASSWORD
+        })
+
+    def incident_id(self):
+        return random.randint(1, SEED_INCIDENTS)
+
+    @task(5)
+    def dashboard(self):
+        self.client.get('/dashboard')
+
+    @task(3)
+    def incident_list(self):
+        self.client.get(f'/incidents?status={random.choice(STATUSES)}', name='/incidents?status=')
+
+    @task(4)
+    def incident_page(self):
+        self.client.get(f'/incidents/{self.incident_id()}', name='/incidents/<id>')
+
+    @task(6)
+    def api_list(self):
+        self.client.get('/api/incidents?limit=50', name='/api/incidents')
+
+    @task(4)
+    def api_incident(self):
+        self.client.get(f'/api/incidents/{self.incident_id()}', name='/api/incidents/<id>')
+
+    @task(2)
+    def api_search(self):
+        self.client.get('/api/incidents/search', params={'q': random.choice(SEARCHES)}, name='/api/incidents/search')
+
+    @task(1)
+    def api_comment(self):
+        self.client.post(f'/api/incidents/{self.incident_id()}/comments', name='/api/incidents/<id>/comments',
+                         json={'content': 'Looking into this'})
+
+    @task(1)
+    def api_status(self):
+        # Only assignees, managers and admins may change a status, so a 403
+        # is an expected answer for most responders
+        with self.client.post(f'/api/incidents/{self.incident_id()}/status', name='/api/incidents/<id>/status',
+                              json={'status': random.choice(STATUSES)}, catch_response=True) as response:
+            if response.status_code == 403:
+                response.success()
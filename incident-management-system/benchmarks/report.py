@@ -0,0 +1,71 @@
+# benchmarks/report.py
+#
+# Runs the pytest-benchmark microbenchmarks and compares their medians with
+# a saved baseline, exiting non-zero when any benchmark got slower by more
+# than the threshold. Record a baseline on the target machine first:
+#
+#     python benchmarks/report.py --save
+#     python benchmarks/report.py --threshold 15
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, '.baseline.json')
+
+def run_benchmarks(extra_args):
+    # Returns {name: median seconds}
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'benchmarks.json')
+        code = pytest.main([BENCH_DIR, '-q', '-p', 'no:cacheprovider', f'--benchmark-json={output}', *extra_args])
+        if code != 0:
+            sys.exit(code)
+        with open(output) as f:
+            results = json.load(f)
+    return {bench['name']: bench['stats']['median'] for bench in results['benchmarks']}
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare microbenchmarks against a saved baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='Record this run as the new baseline.')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', 20)),
+                        help='Allowed slowdown of a median, in percent.')
+    parser.add_argument('pytest_args', nargs='*', help='Passed through to pytest, e.g. -k queries.')
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.pytest_args)
+
+    if args.save or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f'baseline of {len(current)} benchmarks saved to {args.baseline}')
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    print(f'{"benchmark":<32} {"baseline":>12} {"current":>12} {"change":>9}')
+    for name, median in sorted(current.items()):
+        before = baseline.get(name)
+        if before is None:
+            print(f'{name:<32} {"-":>12} {median * 1000:>10.3f}ms {"new":>9}')
+            continue
+        change = (median - before) / before * 100
+        flag = ''
+        if change > args.threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<32} {before * 1000:>10.3f}ms {median * 1000:>10.3f}ms {change:>+8.1f}%{flag}')
+
+    if regressions:
+        print(f'FAIL: {len(regressions)} benchmark(s) more than {args.threshold:g}% slower than the baseline')
+        sys.exit(1)
+    print(f'OK: no benchmark more than {args.threshold:g}% slower than the baseline')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/search_benchmark.py
+#
+# Builds a synthetic SQLite corpus and times ranked full-text searches through
+# app.search.search_incidents.
+#
+#     python benchmarks/search_benchmark.py --rows 1000000 --db /tmp/search.db
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app import create_app
+from app.config import Config
+from app.database import db
+from app.search import search_incidents
+
+WORDS = ('database', 'network', 'latency', 'timeout', 'disk', 'memory', 'cpu', 'outage', 'deploy',
+         'rollback', 'certificate', 'expired', 'dns', 'resolver', 'queue', 'backlog', 'replica', 'lag',
+         'kafka', 'redis', 'postgres', 'nginx', 'gateway', 'error', 'spike', 'login', 'payment', 'api',
+         'cache', 'eviction', 'packet', 'loss', 'firewall', 'storage', 'volume', 'full', 'leak', 'crash')
+TYPES = ('infrastructure', 'application', 'security', 'network', 'database', 'other')
+QUERIES = ('database outage', 'replica lag', 'certificate expired', 'dns', 'memory leak crash',
+           'payment api error', 'redis', 'packet loss firewall', 'disk full', 'time')
+
+# Incident text is dominated by a long tail of service, host and error names,
+# so draw most tokens from a large Zipf-distributed vocabulary
+VOCABULARY = list(WORDS) + [f'{prefix}{n}' for prefix in ('svc', 'host', 'err', 'pod') for n in range(5000)]
+CUM_WEIGHTS = list(itertools.accumulate(1.0 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+def sentence(rng, n):
+    return ' '.join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=n))
+
+def seed(rows, batch=20000):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    db.session.execute(text("INSERT INTO user (id, username, email, role) VALUES (1, 'bench', 'bench@example.com', 'admin')"))
+    for start in range(0, rows, batch):
+        db.session.execute(text(
+            "INSERT INTO incident (title, description, priority, status, incident_type, creator_id, "
+            "created_at, updated_at, occurrence_count) "
+            "VALUES (:title, :description, 'medium', 'open', :incident_type, 1, :now, :now, 1)"
+        ), [{
+            'title': sentence(rng, 5),
+            'description': sentence(rng, 30),
+            'incident_type': rng.choice(TYPES),
+            'now': now
+        } for _ in range(min(batch, rows - start))])
+        db.session.commit()
+        print(f'  seeded {min(start + batch, rows)}/{rows}', end='\r', flush=True)
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description='Time full-text incident search on a synthetic corpus')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db', default='/tmp/incident_search_benchmark.db')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--threshold-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{args.db}'
+
+    app = create_app(BenchmarkConfig)
+
+    with app.app_context():
+        if not os.path.exists(args.db):
+            db.create_all()
+            start = time.perf_counter()
+            seed(args.rows)
+            print(f'seeded {args.rows} incidents in {time.perf_counter() - start:.1f}s')
+
+        timings = []
+        by_query = {q: [] for q in QUERIES}
+        for _ in range(args.repeat):
+            for q in QUERIES:
+                start = time.perf_counter()
+                search_incidents(q, page=1, per_page=20)
+                elapsed = (time.perf_counter() - start) * 1000
+                timings.append(elapsed)
+                by_query[q].append(elapsed)
+
+    # Ranking cost follows how many incidents match, so show it per query
+    for q, elapsed in by_query.items():
+        print(f'  {q:<24} p50 {statistics.median(elapsed):7.1f}ms')
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f'queries: {len(timings)}')
+    print(f'p50:     {statistics.median(timings):.1f}ms')
+    print(f'p95:     {p95:.1f}ms')
+    print(f'max:     {timings[-1]:.1f}ms')
+    if p95 > args.threshold_ms:
+        print(f'FAIL: p95 above {args.threshold_ms}ms')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/seed.py
+#
+# Fills a database with synthetic users, incidents, their comments and
+# 'created' events using batched multi-row inserts, for benchmarks and load
+# tests. The same seed always produces the same data.
+#
+#     python benchmarks/seed.py --db /tmp/incidents.db --users 50 --incidents 100000 --comments 3
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+from app.database import db
+from app.models.user import User
+from app.models.incident import Incident
+from app.models.comment import Comment
+from app.models.incident_event import IncidentEvent
+
+TYPES = ('infrastructure', 'application', 'security', 'network', 'database', 'other')
+PRIORITIES = ('low', 'medium', 'high', 'critical')
+STATUSES = ('open', 'in_progress', 'resolved', 'closed')
+ROLES = ('user', 'user', 'user', 'manager', 'admin')
+WORDS = ('database', 'network', 'latency', 'timeout', 'disk', 'memory', 'cpu', 'outage', 'deploy',
+         'rollback', 'certificate', 'expired', 'dns', 'replica', 'lag', 'queue', 'backlog', 'cache',
+         'gateway', 'error', 'spike', 'login', 'payment', 'api', 'packet', 'loss', 'storage', 'crash')
+
+# Every seeded user can log in with this password
+PASSWORD = 'benchmark'
+DEFAULT_BATCH = 5000
+
+def sentence(rng, n):
+    return ' '.join(rng.choices(WORDS, k=n)).capitalize()
+
+def _insert(model, rows, batch):
+    for start in range(0, len(rows), batch):
+        db.session.execute(insert(model), rows[start:start + batch])
+
+def seed_users(count, rng):
+    # Hashing is deliberately slow, so every user shares one hash
+    password_hash = generate_password_hash(PASSWORD)
+    first = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    rows = [{
+        'id': first + n,
+        'username': f'user{first + n}',
+        'email': f'user{first + n}@example.com',
+        'password_hash': password_hash,
+        'role': 'admin' if n == 0 else rng.choice(ROLES),
+        'notification_mode': 'immediate',
+        'created_at': datetime.utcnow()
+    } for n in range(count)]
+    _insert(User, rows, DEFAULT_BATCH)
+    return [row['id'] for row in rows]
+
+def seed_incidents(count, user_ids, rng, comments=2, days=90, batch=DEFAULT_BATCH):
+    # Creation times are spread evenly over the last `days` days; resolved
+    # and closed incidents get a resolved_at a few hours later. Each incident
+    # gets between 0 and 2 * comments comments, counted on the incident the
+    # way app.queries.create_comment keeps them. Returns (ids, comment count).
+    first = (db.session.query(func.max(Incident.id)).scalar() or 0) + 1
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    ids = []
+    comment_total = 0
+
+    for offset in range(0, count, batch):
+        incidents = []
+        events = []
+        comment_rows = []
+        for n in range(offset, min(offset + batch, count)):
+            created_at = start + step * n
+            status = rng.choice(STATUSES)
+            resolved_at = created_at + timedelta(minutes=rng.randint(5, 600)) if status in ('resolved', 'closed') else None
+            comment_times = sorted(created_at + timedelta(minutes=rng.randint(1, 600))
+                                   for _ in range(rng.randint(0, 2 * comments)))
+            row = {
+                'id': first + n,
+                'title': sentence(rng, 5),
+                'description': sentence(rng, 25),
+                'priority': rng.choice(PRIORITIES),
+                'status': status,
+                'incident_type': rng.choice(TYPES),
+                'creator_id': rng.choice(user_ids),
+                'assignee_id': rng.choice(user_ids) if status != 'open' else None,
+                'created_at': created_at,
+                'updated_at': max([resolved_at or created_at] + comment_times),
+                'resolved_at': resolved_at,
+                'occurrence_count': 1,
+                'comment_count': len(comment_times),
+                'last_activity_at': comment_times[-1] if comment_times else created_at
+            }
+            incidents.append(row)
+            events.append({
+                'incident_id': row['id'],
+                'event_type': 'created',
+                'to_value': 'open',
+                'actor_id': row['creator_id'],
+                'priority': row['priority'],
+                'incident_type': row['incident_type'],
+                'assignee_id': None,
+                'created_at': created_at
+            })
+            comment_rows.extend({
+                'content': sentence(rng, 12),
+                'incident_id': row['id'],
+                'author_id': rng.choice(user_ids),
+                'created_at': at
+            } for at in comment_times)
+        db.session.execute(insert(Incident), incidents)
+        db.session.execute(insert(IncidentEvent), events)
+        if comment_rows:
+            db.session.execute(insert(Comment), comment_rows)
+        db.session.commit()
+        ids.extend(row['id'] for row in incidents)
+        comment_total += len(comment_rows)
+    return ids, comment_total
+
+def seed(users=20, incidents=10000, comments=2, seed=42):
+    # Returns (user_ids, incident_ids, comment_count); needs an app context
+    rng = random.Random(seed)
+    user_ids = seed_users(users, rng)
+    db.session.commit()
+    incident_ids, comment_count = seed_incidents(incidents, user_ids, rng, comments)
+    return user_ids, incident_ids, comment_count
+
+def main():
+    from app import create_app
+    from app.config import Config
+
+    parser = argparse.ArgumentParser(description='Seed a database with synthetic incidents')
+    parser.add_argument('--db', help='SQLite file to create; defaults to DATABASE_URL.')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--incidents', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=2, help='Average comments per incident.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    class SeedConfig(Config):
+        if args.db:
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{os.path.abspath(args.db)}'
+
+    app = create_app(SeedConfig)
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        user_ids, incident_ids, comment_count = seed(args.users, args.incidents, args.comments, args.seed)
+        print(f'seeded {len(user_ids)} users, {len(incident_ids)} incidents and {comment_count} comments '
+              f'in {time.perf_counter() - start:.1f}s')
+
+if __name__ == '__main__':
+    main()
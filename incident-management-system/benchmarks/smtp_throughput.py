@@ -0,0 +1,80 @@
+# benchmarks/smtp_throughput.py
+#
+# Measures notification throughput through NotificationDispatcher against a
+# local aiosmtpd stand-in server (pip install aiosmtpd).
+#
+#     python benchmarks/smtp_throughput.py --messages 2000 --workers 4
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+from app import create_app
+from app.config import Config
+from app.email_service import send_email, get_dispatcher
+
+class CountingHandler:
+    def __init__(self):
+        self.messages = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        with self._lock:
+            self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.messages += 1
+        return '250 OK'
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure notification throughput against a local SMTP server")
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--queue-size', type=int, default=1000)
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = args.port
+        MAIL_SUPPRESS_SEND = False
+        MAIL_USE_TLS = False
+        MAIL_USE_SSL = False
+        MAIL_USERNAME = None
+        MAIL_PASSWORD = None
+        MAIL_DEFAULT_SENDER = 'bench@example.com'
+        MAIL_WORKERS = args.workers
+        MAIL_QUEUE_SIZE = args.queue_size
+
+    app = create_app(BenchmarkConfig)
+
+    try:
+        with app.test_request_context():
+            start = time.perf_counter()
+            for i in range(args.messages):
+                send_email(f'Benchmark {i}', ['oncall@example.com'], 'body')
+            get_dispatcher().shutdown(timeout=300)
+            elapsed = time.perf_counter() - start
+    finally:
+        controller.stop()
+
+    print(f'messages:    {handler.messages}/{args.messages}')
+    print(f'connections: {handler.connections}')
+    print(f'elapsed:     {elapsed:.2f}s')
+    print(f'throughput:  {handler.messages / elapsed:.0f} msg/s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""add full text search
+
+Revision ID: 9a3f27c1d4e8
+Revises: 6dcff75ea39a
+Create Date: 2026-10-18 19:06:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3f27c1d4e8'
+down_revision = '6dcff75ea39a'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE incident_fts USING fts5("
+    "title, description, content='incident', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE VIRTUAL TABLE comment_fts USING fts5("
+    "content, content='comment', content_rowid='id', tokenize='porter unicode61')",
+    # Title hits count ten times as much as description hits
+    "INSERT INTO incident_fts(incident_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "CREATE TRIGGER incident_fts_ai AFTER INSERT ON incident BEGIN "
+    "INSERT INTO incident_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER incident_fts_ad AFTER DELETE ON incident BEGIN "
+    "INSERT INTO incident_fts(incident_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER incident_fts_au AFTER UPDATE OF title, description ON incident BEGIN "
+    "INSERT INTO incident_fts(incident_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO incident_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER comment_fts_ai AFTER INSERT ON comment BEGIN "
+    "INSERT INTO comment_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER comment_fts_ad AFTER DELETE ON comment BEGIN "
+    "INSERT INTO comment_fts(comment_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER comment_fts_au AFTER UPDATE OF content ON comment BEGIN "
+    "INSERT INTO comment_fts(comment_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO comment_fts(rowid, content) VALUES (new.id, new.content); END",
+    # Index the rows that already exist
+    "INSERT INTO incident_fts(incident_fts) VALUES ('rebuild')",
+    "INSERT INTO comment_fts(comment_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS comment_fts_au",
+    "DROP TRIGGER IF EXISTS comment_fts_ad",
+    "DROP TRIGGER IF EXISTS comment_fts_ai",
+    "DROP TRIGGER IF EXISTS incident_fts_au",
+    "DROP TRIGGER IF EXISTS incident_fts_ad",
+    "DROP TRIGGER IF EXISTS incident_fts_ai",
+    "DROP TABLE IF EXISTS comment_fts",
+    "DROP TABLE IF EXISTS incident_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE INDEX ix_incident_search ON incident USING gin "
+    "(to_tsvector('english', title || ' ' || description))",
+    "CREATE INDEX ix_comment_search ON comment USING gin "
+    "(to_tsvector('english', content))",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_comment_search",
+    "DROP INDEX IF EXISTS ix_incident_search",
+]
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_UPGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == 'postgresql':
+        _run(POSTGRES_DOWNGRADE)
@@ -0,0 +1,84 @@
+# tests/conftest.py
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.config import TestingConfig
+from app.database import db
+from app.models.user import User
+from app.models.incident import Incident
+from app.models.comment import Comment
+
+def build_app(config_class=TestingConfig):
+    # An app on a fresh database holding one admin, user 1
+    app = create_app(config_class)
+    with app.app_context():
+        # The default bind only: db remembers bind keys, such as the replicas
+        # of tests/test_replicas.py, from apps built earlier in the run
+        db.create_all(bind_key=None)
+        admin = User(username='admin', email='admin@example.com', role='admin')
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.commit()
+        db.session.remove()
+    return app
+
+@pytest.fixture
+def app():
+    # Requests must not run inside an app context held here: they would
+    # share its g, where Flask-Login keeps the loaded user
+    app = build_app()
+    yield app
+    with app.app_context():
+        db.drop_all(bind_key=None)
+
+@pytest.fixture
+def engine(app):
+    with app.app_context():
+        return db.engine
+
+@pytest.fixture
+def client(app):
+    # Logged in as user 1, the admin
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+@pytest.fixture
+def add_incidents(app):
+    # Adds n open incidents, each created by and assigned to a user of its
+    # own and carrying `comments` comments by that user, so per-row lazy
+    # loads can't be answered from the identity map
+    def add(n, comments=0):
+        with app.app_context():
+            _add(n, comments)
+
+    def _add(n, comments):
+        # Hashing a password per user would dominate the test's run time
+        admin_password_hash = db.session.get(User, 1).password_hash
+        now = datetime.utcnow()
+        for i in range(n):
+            username = f'user{User.query.count()}'
+            user = User(username=username, email=f'{username}@example.com', role='user',
+                        password_hash=admin_password_hash)
+            db.session.add(user)
+            db.session.flush()
+            created_at = now - timedelta(minutes=i)
+            incident = Incident(title=f'Incident {i}', description='Disk full on db-1', priority='high',
+                                incident_type='database', status='open', creator_id=user.id,
+                                assignee_id=user.id, created_at=created_at, updated_at=created_at)
+            db.session.add(incident)
+            db.session.flush()
+            for j in range(comments):
+                db.session.add(Comment(content=f'Comment {j}', incident_id=incident.id, author_id=user.id,
+                                       created_at=created_at + timedelta(seconds=j)))
+            incident.comment_count = comments
+        db.session.commit()
+        db.session.remove()
+    return add
@@ -0,0 +1,131 @@
+# tests/test_asgi.py
+#
+# The async handlers of app/asgi.py must answer like their Flask twins in
+# app/routes/api.py: same status, same body, same ETag.
+import asyncio
+import json
+from datetime import datetime, timedelta
+import pytest
+from app import create_app
+from app.asgi import AsyncAPI
+from app.config import TestingConfig
+from app.database import db
+from app.models.incident import Incident
+from app.models.user import User
+
+PARITY_URLS = [
+    '/api/incidents',
+    '/api/incidents?limit=2&fields=id,title,status',
+    '/api/incidents?status=closed',
+    '/api/incidents?limit=0',
+    '/api/incidents?cursor=bad',
+    '/api/incidents/2',
+    '/api/incidents/999'
+]
+
+@pytest.fixture
+def app(tmp_path):
+    # A file, as the async engine can't share an in-memory database
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "incidents.db"}'
+        SYNC_SETTLE_SECONDS = 0
+
+    app = create_app(FileConfig)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all(bind_key=None)
+        admin = User(username='admin', email='admin@example.com', role='admin')
+        admin.set_password('password')
+        db.session.add(admin)
+        db.session.flush()
+        for i in range(5):
+            created_at = now - timedelta(minutes=i)
+            db.session.add(Incident(title=f'Incident {i}', description='Disk full', priority='high',
+                                    incident_type='database', status='closed' if i % 2 else 'open',
+                                    creator_id=admin.id, created_at=created_at, updated_at=created_at))
+        db.session.commit()
+        db.session.remove()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def asgi(app):
+    # Calls the ASGI app on one event loop, as its async engine pools
+    # connections per loop
+    api = AsyncAPI(app)
+    loop = asyncio.new_event_loop()
+
+    def get(url, cookies=None, headers=None):
+        path, _, query = url.partition('?')
+        header_list = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+        if cookies:
+            header_list.append((b'cookie', '; '.join(f'{k}={v}' for k, v in cookies.items()).encode()))
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+                 'query_string': query.encode(), 'headers': header_list, 'client': ('127.0.0.1', 50000),
+                 'server': ('localhost', 80)}
+        return loop.run_until_complete(call(api, scope))
+
+    yield get
+    for engine in api.engines.values():
+        loop.run_until_complete(engine.dispose())
+    loop.close()
+
+async def call(api, scope):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await api(scope, receive, send)
+    start = messages[0]
+    headers = {name.decode().lower(): value.decode() for name, value in start['headers']}
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], headers, body
+
+def signed_in(app, remember=False):
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'admin', 'password': 'password',
+                                           'remember_me': 'y' if remember else ''})
+    assert response.status_code == 302
+    return client
+
+def cookies_of(client, *names):
+    return {name: client.get_cookie(name).value for name in names}
+
+def assert_same(flask_response, asgi_response):
+    status, headers, body = asgi_response
+    assert status == flask_response.status_code
+    assert headers.get('etag') == flask_response.headers.get('ETag')
+    if status != 304:
+        assert json.loads(body) == flask_response.get_json()
+
+@pytest.mark.parametrize('url', PARITY_URLS)
+def test_answers_match_the_flask_views(app, asgi, url):
+    client = signed_in(app)
+    cookies = cookies_of(client, 'session')
+    flask_response = client.get(url)
+    assert_same(flask_response, asgi(url, cookies))
+
+    etag = flask_response.headers.get('ETag')
+    if etag:
+        revalidated = client.get(url, headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304
+        assert_same(revalidated, asgi(url, cookies, {'If-None-Match': etag}))
+
+@pytest.mark.parametrize('url', ['/api/incidents', '/api/incidents/2'])
+def test_anonymous_requests_are_refused_alike(app, asgi, url):
+    assert_same(app.test_client().get(url), asgi(url))
+
+@pytest.mark.parametrize('url', ['/api/incidents', '/api/incidents/2'])
+def test_remember_cookie_signs_in_on_both_sides(app, asgi, url):
+    remembered = cookies_of(signed_in(app, remember=True), 'remember_token')
+    client = app.test_client()
+    client.set_cookie('remember_token', remembered['remember_token'])
+    flask_response = client.get(url)
+    assert flask_response.status_code == 200
+    assert_same(flask_response, asgi(url, remembered))
@@ -0,0 +1,86 @@
+# tests/test_principals.py
+#
+# API tokens reach only what their scopes allow, revocation and expiry take
+# effect at once, and the principal cache never serves a user or token as
+# it was before a committed change.
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import principals
+from app.database import db
+from app.models.user import User
+from app.principals import invalidate_principals, issue_token, load_principal
+
+NEW_INCIDENT = {'title': 'Disk full', 'description': 'db-1', 'priority': 'high', 'incident_type': 'database'}
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    invalidate_principals()
+
+def create_token(client, scopes):
+    response = client.post('/api/tokens', json={'name': 'test', 'scopes': scopes})
+    assert response.status_code == 201
+    data = response.get_json()
+    return data['token'], data['api_token']['id']
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+def test_read_token_cannot_write(app, client):
+    token, _ = create_token(client, ['read'])
+    api = app.test_client()
+    assert api.get('/api/incidents', headers=bearer(token)).status_code == 200
+    response = api.post('/api/incidents', json=NEW_INCIDENT, headers=bearer(token))
+    assert response.status_code == 403
+    assert response.get_json() == {'error': 'Token lacks the write scope'}
+
+def test_write_token_can_write(app, client):
+    token, _ = create_token(client, ['read', 'write'])
+    assert app.test_client().post('/api/incidents', json=NEW_INCIDENT, headers=bearer(token)).status_code == 201
+
+def test_revoked_token_is_refused_at_once(app, client):
+    token, token_id = create_token(client, ['read'])
+    api = app.test_client()
+    # Cached by this request
+    assert api.get('/api/incidents', headers=bearer(token)).status_code == 200
+    assert client.delete(f'/api/tokens/{token_id}').status_code == 200
+    assert api.get('/api/incidents', headers=bearer(token)).status_code == 401
+
+def test_expired_token_is_refused(app):
+    with app.app_context():
+        token, _ = issue_token(1, 'expired', ['read'], datetime.utcnow() - timedelta(seconds=1))
+        db.session.commit()
+    assert app.test_client().get('/api/incidents', headers=bearer(token)).status_code == 401
+
+def test_bearer_token_is_ignored_outside_the_api(app, client):
+    token, _ = create_token(client, ['read', 'write'])
+    response = app.test_client().get('/incidents', headers=bearer(token))
+    assert response.status_code == 302
+    assert '/login' in response.headers['Location']
+
+def test_role_change_drops_cached_principals(app, client):
+    assert client.get('/api/incidents').status_code == 200
+    assert ('user', 1) in principals._principals
+
+    with app.app_context():
+        db.session.get(User, 1).role = 'user'
+        db.session.commit()
+        assert principals._principals == {}
+        assert load_principal(1).role == 'user'
+
+def test_principal_loaded_across_an_invalidation_is_not_cached(app, engine):
+    # Another thread commits a user change while this one is reading the row
+    def invalidate_mid_load(conn, cursor, statement, parameters, context, executemany):
+        invalidate_principals()
+
+    with app.app_context():
+        event.listen(engine, 'before_cursor_execute', invalidate_mid_load)
+        try:
+            principal = load_principal(1)
+        finally:
+            event.remove(engine, 'before_cursor_execute', invalidate_mid_load)
+        assert principal.username == 'admin'
+        assert ('user', 1) not in principals._principals
+
+        load_principal(1)
+        assert ('user', 1) in principals._principals
@@ -0,0 +1,34 @@
+# tests/test_query_counts.py
+#
+# Listing pages must issue a fixed number of statements however many rows
+# they show; a lazy load per row shows up here as a count that grows with N.
+import pytest
+from app.principals import invalidate_principals
+from app.queries import QueryCounter
+from app.stats import invalidate_stats
+
+N = 3
+
+def count_statements(client, engine, url):
+    # Cold caches, so both sizes run the same statements
+    invalidate_principals()
+    invalidate_stats()
+    with QueryCounter(engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
+
+@pytest.mark.parametrize('url', ['/incidents', '/dashboard'])
+def test_listing_statements_do_not_grow_with_rows(client, engine, add_incidents, url):
+    add_incidents(N, comments=1)
+    few = count_statements(client, engine, url)
+    add_incidents(9 * N, comments=1)
+    many = count_statements(client, engine, url)
+    assert many == few
+
+def test_comment_statements_do_not_grow_with_comments(client, engine, add_incidents):
+    add_incidents(1, comments=N)
+    few = count_statements(client, engine, '/api/incidents/1/comments')
+    add_incidents(1, comments=10 * N)
+    many = count_statements(client, engine, '/api/incidents/2/comments')
+    assert many == few
@@ -0,0 +1,78 @@
+# tests/test_query_plans.py
+#
+# Runs EXPLAIN QUERY PLAN on the statements the hot routes actually send and
+# checks every incident and comment read goes through an index: a SEARCH on
+# one, or, for a first page, an index-ordered SCAN that LIMIT cuts short.
+# A bare table scan or a temporary B-tree for ORDER BY fails the test.
+import re
+import pytest
+from sqlalchemy import event
+
+HOT_TABLES = re.compile(r'\b(FROM|JOIN) (incident|comment)\b')
+INDEXED = ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY')
+
+def indexed(step):
+    return any(access in step for access in INDEXED)
+
+@pytest.fixture
+def statements(engine):
+    # (statement, parameters) of every SELECT sent while the test runs
+    sent = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            sent.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield sent
+    event.remove(engine, 'before_cursor_execute', record)
+
+def query_plans(engine, statements):
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            if HOT_TABLES.search(statement):
+                plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+                yield statement, [row[3] for row in plan]
+
+def assert_indexed(engine, statements):
+    checked = 0
+    for statement, plan in query_plans(engine, statements):
+        checked += 1
+        for step in plan:
+            if re.match(r'SCAN (incident|comment)\b', step):
+                assert indexed(step), (step, statement)
+            assert 'USE TEMP B-TREE' not in step, (step, statement)
+        assert any(indexed(step) for step in plan), (plan, statement)
+    assert checked
+
+@pytest.mark.parametrize('url', [
+    '/incidents',
+    '/incidents?status=open',
+    '/incidents?priority=high',
+    '/incidents?type=database',
+    '/dashboard',
+    '/api/incidents',
+    '/api/incidents?fields=id,title,status',
+    '/api/incidents?status=open',
+])
+def test_incident_listings_use_indexes(client, engine, add_incidents, statements, url):
+    add_incidents(60)
+    statements.clear()
+    assert client.get(url).status_code == 200
+    assert_indexed(engine, statements)
+
+def test_later_pages_use_indexes(client, engine, add_incidents, statements):
+    add_incidents(60)
+    cursor = client.get('/api/incidents?limit=20').get_json()['next_cursor']
+    statements.clear()
+    assert client.get(f'/api/incidents?limit=20&cursor={cursor}').status_code == 200
+    assert client.get(f'/incidents?cursor={cursor}').status_code == 200
+    assert client.get(f'/dashboard?cursor={cursor}').status_code == 200
+    assert_indexed(engine, statements)
+
+@pytest.mark.parametrize('url', ['/incidents/1', '/api/incidents/1/comments'])
+def test_comment_timelines_use_indexes(client, engine, add_incidents, statements, url):
+    add_incidents(3, comments=30)
+    statements.clear()
+    assert client.get(url).status_code == 200
+    assert_indexed(engine, statements)
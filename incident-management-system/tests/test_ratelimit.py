@@ -0,0 +1,109 @@
+# tests/test_ratelimit.py
+#
+# The API rate limiter with small budgets: 429 with Retry-After once a
+# bucket is empty, per-view budgets, load shedding by queue time, client
+# addresses behind proxies, and bounded per-process buckets.
+import time
+import pytest
+from conftest import build_app
+from app.config import TestingConfig
+from app.database import db
+from app.proxy import forwarded_addr
+from app.ratelimit import MemoryBuckets
+
+class RateLimitedConfig(TestingConfig):
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_CHEAP = '1,2'
+    RATE_LIMIT_EXPENSIVE = '0.1,1'
+    RATE_LIMIT_WRITE = '1,1'
+    SHED_QUEUE_MS = 1000
+    PROXY_FIX_HOPS = 1
+
+@pytest.fixture
+def app():
+    app = build_app(RateLimitedConfig)
+    yield app
+    with app.app_context():
+        db.drop_all(bind_key=None)
+
+def queued_for(seconds):
+    return {'X-Request-Start': f't={(time.time() - seconds) * 1000:.0f}'}
+
+def test_empty_bucket_answers_429_with_retry_after(client):
+    # GET /api/incidents/<id> spends from the cheap budget: a burst of 2
+    assert client.get('/api/incidents/1').status_code == 404
+    assert client.get('/api/incidents/1').status_code == 404
+    response = client.get('/api/incidents/1')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json() == {'error': 'Rate limit exceeded', 'retry_after': 1}
+
+def test_rate_budget_picks_the_bucket(client):
+    # GET /api/incidents is marked expensive: a burst of 1, one every 10s
+    assert client.get('/api/incidents').status_code == 200
+    response = client.get('/api/incidents')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
+    # Other budgets keep their own buckets
+    assert client.get('/api/incidents/1').status_code == 404
+    assert client.put('/api/incidents/1', json={'priority': 'low'}).status_code == 404
+    assert client.put('/api/incidents/1', json={'priority': 'low'}).status_code == 429
+
+def test_pages_outside_the_api_are_not_limited(client):
+    for _ in range(5):
+        assert client.get('/incidents').status_code == 200
+
+def test_reads_are_shed_when_requests_queue(client):
+    # Expensive reads go past SHED_QUEUE_MS, cheap ones past twice that
+    response = client.get('/api/incidents', headers=queued_for(1.5))
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json() == {'error': 'Server busy, retry shortly', 'retry_after': 1}
+    assert client.get('/api/incidents/1', headers=queued_for(1.5)).status_code == 404
+    assert client.get('/api/incidents/1', headers=queued_for(2.5)).status_code == 503
+    # Writes are never shed
+    assert client.put('/api/incidents/1', json={'priority': 'low'}, headers=queued_for(60)).status_code == 404
+    # and a request that didn't queue is served
+    assert client.get('/api/incidents').status_code == 200
+
+def test_anonymous_clients_are_counted_by_forwarded_address(app):
+    def get(forwarded_for):
+        return app.test_client().get('/api/incidents/1', headers={'X-Forwarded-For': forwarded_for},
+                                     environ_base={'REMOTE_ADDR': '172.18.0.2'})
+
+    assert get('203.0.113.1').status_code == 401
+    assert get('203.0.113.1').status_code == 401
+    assert get('203.0.113.1').status_code == 429
+    # Entries left of the one the proxy wrote are the client's own claim
+    assert get('198.51.100.7, 203.0.113.1').status_code == 429
+    assert get('203.0.113.2').status_code == 401
+
+@pytest.mark.parametrize('forwarded_for, hops, expected', [
+    (None, 1, '10.0.0.1'),
+    ('203.0.113.1', 0, '10.0.0.1'),
+    ('203.0.113.1', 1, '203.0.113.1'),
+    ('198.51.100.7, 203.0.113.1', 1, '203.0.113.1'),
+    ('198.51.100.7, 203.0.113.1, 10.0.0.2', 2, '203.0.113.1'),
+    ('203.0.113.1', 2, '10.0.0.1'),
+])
+def test_forwarded_addr_counts_hops_from_the_right(forwarded_for, hops, expected):
+    assert forwarded_addr('10.0.0.1', forwarded_for, hops) == expected
+
+def test_memory_buckets_evict_idle_then_least_recently_used():
+    buckets = MemoryBuckets(refill_seconds=10, max_buckets=3)
+    for key in 'abc':
+        buckets.take(key, 1, 2)
+    buckets.take('a', 1, 2)
+    assert buckets.take('a', 1, 2) > 0
+
+    # A new key over the limit evicts the least recently used, b
+    buckets.take('d', 1, 2)
+    assert list(buckets._buckets) == ['c', 'a', 'd']
+    # and the exhausted bucket survives the churn
+    assert buckets.take('a', 1, 2) > 0
+
+    # A bucket idle long enough to refill is dropped as soon as it is seen
+    tokens, _ = buckets._buckets['c']
+    buckets._buckets['c'] = (tokens, time.monotonic() - 11)
+    buckets.take('a', 1, 2)
+    assert list(buckets._buckets) == ['d', 'a']
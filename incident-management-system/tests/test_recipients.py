@@ -0,0 +1,45 @@
+# tests/test_recipients.py
+#
+# The recipient directory is cached per process; any committed change to a
+# user, however it is made, must drop it.
+from app.database import db
+from app.models.user import User
+from app.recipients import digest_emails, emails_for_users, staff_emails
+
+def add_user(username, role='user'):
+    user = User(username=username, email=f'{username}@example.com', role=role, password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def test_committed_user_changes_drop_the_directory(app):
+    with app.app_context():
+        assert staff_emails() == ['admin@example.com']
+        user = add_user('manager', role='manager')
+        assert staff_emails() == ['admin@example.com', 'manager@example.com']
+
+        assert emails_for_users([user.id]) == ['manager@example.com']
+        user.email = 'ops@example.com'
+        user.role = 'user'
+        user.notification_mode = 'digest'
+        db.session.commit()
+        assert emails_for_users([user.id]) == ['ops@example.com']
+        assert staff_emails() == ['admin@example.com']
+        assert digest_emails() == {'ops@example.com'}
+
+def test_rolled_back_changes_keep_the_directory(app):
+    with app.app_context():
+        assert staff_emails() == ['admin@example.com']
+        db.session.get(User, 1).role = 'user'
+        db.session.flush()
+        db.session.rollback()
+        assert staff_emails() == ['admin@example.com']
+
+def test_cached_emails_expire(app):
+    app.config['RECIPIENT_CACHE_TTL'] = 0
+    with app.app_context():
+        assert emails_for_users([1]) == ['admin@example.com']
+        # A write the ORM never sees, so only the TTL can catch it
+        db.session.execute(db.update(User).where(User.id == 1).values(email='root@example.com'))
+        db.session.commit()
+        assert emails_for_users([1]) == ['root@example.com']
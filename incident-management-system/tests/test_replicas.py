@@ -0,0 +1,101 @@
+# tests/test_replicas.py
+#
+# Read replica routing with a primary and a replica SQLite file. Each holds a
+# differently titled copy of incident 1, so a response shows which one it
+# was read from.
+from datetime import datetime
+import pytest
+from flask import g
+from sqlalchemy import func, insert, select, text, update
+from app import create_app
+from app.config import TestingConfig
+from app.database import db
+from app.models.incident import Incident
+from app.models.user import User
+
+def seed(engine, title):
+    db.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(User), [{'id': 1, 'username': 'admin', 'email': 'admin@example.com',
+                                           'role': 'admin', 'password_hash': 'x'}])
+        connection.execute(insert(Incident), [{'id': 1, 'title': title, 'description': 'Disk full',
+                                               'priority': 'high', 'incident_type': 'database', 'status': 'open',
+                                               'creator_id': 1, 'created_at': now, 'updated_at': now}])
+
+@pytest.fixture
+def app(tmp_path):
+    class ReplicatedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "primary.db"}'
+        DATABASE_REPLICA_URLS = [f'sqlite:///{tmp_path / "replica.db"}']
+
+    app = create_app(ReplicatedConfig)
+    with app.app_context():
+        seed(db.engines[None], 'Primary copy')
+        seed(db.engines['replica_0'], 'Replica copy')
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+def incident_title(client):
+    response = client.get('/api/incidents/1')
+    assert response.status_code == 200
+    return response.get_json()['title']
+
+def incident_count(app, key):
+    with app.app_context():
+        with db.engines[key].connect() as connection:
+            return connection.execute(select(func.count()).select_from(Incident)).scalar()
+
+def test_read_only_routes_read_from_the_replica(client):
+    assert incident_title(client) == 'Replica copy'
+    response = client.get('/incidents')
+    assert b'Replica copy' in response.data and b'Primary copy' not in response.data
+
+def test_reads_after_a_write_go_to_the_primary(client, app):
+    assert incident_title(client) == 'Replica copy'
+    response = client.post('/api/incidents', json={'title': 'New', 'description': 'Written',
+                                                   'priority': 'low', 'incident_type': 'other'})
+    assert response.status_code == 201
+    assert incident_title(client) == 'Primary copy'
+
+    # Once REPLICA_STICKY_SECONDS have passed, reads go back to the replica
+    with client.session_transaction() as session:
+        session['db_primary_until'] = 0
+    assert incident_title(client) == 'Replica copy'
+
+    # The write itself only ever reached the primary
+    assert incident_count(app, None) == 2
+    assert incident_count(app, 'replica_0') == 1
+
+def test_flushes_and_dml_never_use_the_replica(app):
+    with app.test_request_context('/api/incidents'):
+        g.db_replica = 'replica_0'
+        primary, replica = db.engines[None], db.engines['replica_0']
+
+        assert db.session.get_bind(clause=select(Incident)) is replica
+        assert db.session.get_bind(clause=text('SELECT 1')) is replica
+        assert db.session.get_bind(clause=update(Incident)) is primary
+        assert db.session.get_bind(clause=text('UPDATE incident SET priority = priority')) is primary
+        assert db.session.get_bind() is primary
+
+        incident = db.session.get(Incident, 1)
+        assert incident.title == 'Replica copy'
+        incident.priority = 'low'
+        db.session.add(Incident(title='Flushed', description='Written', priority='low',
+                                incident_type='other', creator_id=1))
+        db.session.commit()
+        db.session.execute(update(Incident).where(Incident.id == 1).values(status='closed'))
+        db.session.commit()
+        db.session.remove()
+
+    assert incident_count(app, None) == 2
+    assert incident_count(app, 'replica_0') == 1
+    with app.app_context():
+        with db.engines[None].connect() as connection:
+            assert connection.execute(select(Incident.priority, Incident.status)
+                                      .where(Incident.id == 1)).one() == ('low', 'closed')
+        with db.engines['replica_0'].connect() as connection:
+            assert connection.execute(select(Incident.priority, Incident.status)
+                                      .where(Incident.id == 1)).one() == ('high', 'open')
@@ -0,0 +1,63 @@
+# tests/test_search.py
+#
+# Every page of a search must come from the same ranked candidates, best
+# first, and the list filters must narrow those candidates rather than the
+# page they were cut to.
+from datetime import datetime, timedelta
+import pytest
+from app.database import db
+from app.models.comment import Comment
+from app.models.incident import Incident
+
+@pytest.fixture
+def corpus(app):
+    # Three old, closed incidents with the term in their title, then many
+    # newer open ones that only mention it in their description
+    app.config['SEARCH_CANDIDATE_LIMIT'] = 50
+    now = datetime.utcnow()
+    with app.app_context():
+        for i in range(3):
+            created_at = now - timedelta(days=365, minutes=i)
+            db.session.add(Incident(title='Database disk full', description='Volume at 100%', priority='high',
+                                    incident_type='database', status='closed', creator_id=1,
+                                    created_at=created_at, updated_at=created_at))
+        for i in range(100):
+            created_at = now - timedelta(minutes=i)
+            db.session.add(Incident(title=f'Slow responses {i}', description='Some disk pressure on the host',
+                                    priority='low', incident_type='other', status='open', creator_id=1,
+                                    created_at=created_at, updated_at=created_at))
+        db.session.commit()
+        db.session.remove()
+
+def search_pages(client, url):
+    ids, page = [], 1
+    while page:
+        response = client.get(f'{url}&page={page}')
+        assert response.status_code == 200
+        data = response.get_json()
+        ids += [incident['id'] for incident in data['incidents']]
+        page = data['next_page']
+    return ids
+
+def test_pages_come_from_one_candidate_set(client, corpus):
+    ids = search_pages(client, '/api/incidents/search?q=disk&limit=20')
+    assert len(ids) == len(set(ids)) == 50
+    assert sorted(ids[:3]) == [1, 2, 3]
+
+def test_filters_apply_before_the_candidates_are_cut(client, corpus):
+    response = client.get('/incidents?q=disk&status=closed')
+    assert response.status_code == 200
+    for incident_id in (1, 2, 3):
+        assert f'/incidents/{incident_id}"'.encode() in response.data
+    assert b'Slow responses' not in response.data
+
+def test_comment_matches_are_ranked_below_title_matches(client, corpus, app):
+    with app.app_context():
+        db.session.add(Comment(content='Cleared the disk cache', incident_id=50, author_id=1))
+        db.session.add(Comment(content='Unrelated note', incident_id=51, author_id=1))
+        db.session.commit()
+        db.session.remove()
+    ids = search_pages(client, '/api/incidents/search?q=cache&limit=20')
+    assert ids == [50]
+    ids = search_pages(client, '/api/incidents/search?q=disk&limit=20')
+    assert sorted(ids[:3]) == [1, 2, 3] and 50 in ids
@@ -0,0 +1,59 @@
+# tests/test_sync.py
+#
+# Incremental sync: a full listing hands out a sync_token, updated_since
+# returns what changed and what was deleted after it, unchanged answers
+# revalidate to 304, and tokens older than the tombstone retention get 410.
+import pytest
+
+@pytest.fixture
+def settled(app):
+    # No settle window, so a token covers everything already written
+    app.config['SYNC_SETTLE_SECONDS'] = 0
+
+def full_listing(client):
+    response = client.get('/api/incidents')
+    assert response.status_code == 200
+    return response
+
+def test_full_listing_revalidates(client, add_incidents):
+    add_incidents(3)
+    response = full_listing(client)
+    assert response.headers['ETag']
+    again = client.get('/api/incidents', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+
+def test_changes_and_deletions_since_a_token(client, add_incidents, settled):
+    add_incidents(3)
+    token = full_listing(client).get_json()['sync_token']
+
+    assert client.put('/api/incidents/2', json={'priority': 'low'}).status_code == 200
+    assert client.delete('/api/incidents/3').status_code == 200
+
+    response = client.get(f'/api/incidents?updated_since={token}')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [incident['id'] for incident in data['incidents']] == [2]
+    assert data['deleted'] == [3]
+    assert data['has_more'] is False
+
+    # Nothing has changed since, so the same question revalidates
+    again = client.get(f'/api/incidents?updated_since={token}',
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+
+    # The new token reports no further changes; a deletion may repeat, as
+    # tokens only advance with updated_at and deleting is idempotent
+    data = client.get(f'/api/incidents?updated_since={data["sync_token"]}').get_json()
+    assert data['incidents'] == []
+    assert set(data['deleted']) <= {3}
+
+def test_tokens_past_the_tombstone_retention_are_gone(client):
+    response = client.get('/api/incidents?updated_since=2000-01-01T00:00:00Z')
+    assert response.status_code == 410
+
+@pytest.mark.parametrize('value', ['bad', '2026-13-45', 'eyJub3QiOiAiYSBjdXJzb3IifQ'])
+def test_invalid_updated_since_names_the_parameter(client, value):
+    response = client.get(f'/api/incidents?updated_since={value}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid updated_since'}